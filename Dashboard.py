@@ -4,13 +4,18 @@ import plotly.graph_objects as go
 import markdown2
 from weasyprint import HTML
 from helpers.db import (
-    get_all_summaries, 
-    get_summary_by_id, 
+    get_summary_previews, 
     init_db,
     get_summary_stats,
     get_quiz_scores_by_summary,
     delete_summary
 )
+from helpers.analytics import get_overview, mastery_tier
+from helpers.bulk_export import export_summaries, remove_stale_exports, EXPORT_PREFIX
+from helpers.session_user import get_current_user
+from helpers.content_cache import get_summary_content, forget_summary
+from helpers.pdf_extraction import remove_file
+import tempfile
 
 init_db()
 
@@ -24,14 +29,16 @@ st.set_page_config(
 st.title("🎓 AI Study Assistant")
 st.markdown("---")
 
-summaries = get_all_summaries()
+user_id = get_current_user()
+summaries = get_summary_previews(user_id)
 
 if not summaries:
     st.info("📚 No saved summaries yet. Go to Upload and create one!")
 else:
     # Summary Selection with Cards
     st.markdown("### 📚 Select a Summary")
-    summary_dict = {title: sid for sid, title in summaries}
+    summary_dict = {title: sid for sid, title, _, _ in summaries}
+    previews = {title: preview for _, title, preview, _ in summaries}
     selected = st.session_state.get("selected_summary_title")
     
     # Display summary cards in 3 columns
@@ -45,6 +52,9 @@ else:
             else:
                 st.markdown(f"📖 {title}")
                 button_label = "Select"
+            preview = previews.get(title)
+            if preview:
+                st.caption(preview if len(preview) <= 120 else preview[:120] + "…")
             
             # Select and Delete buttons side by side
             button_cols = st.columns(2)
@@ -52,18 +62,16 @@ else:
             with button_cols[0]:
                 if st.button(button_label, key=f"card_{idx}", use_container_width=True):
                     summary_id = summary_dict[title]
-                    content = get_summary_by_id(summary_id)
-                    st.session_state["selected_summary"] = content
+                    # Only ids live in the session; content comes from the shared cache
                     st.session_state["selected_summary_title"] = title
                     st.session_state["selected_summary_id"] = summary_id
                     st.rerun()
             
             with button_cols[1]:
                 if st.button("🗑️", key=f"delete_{idx}", use_container_width=True):
-                    delete_summary(summary_dict[title])
+                    delete_summary(summary_dict[title], user_id)
+                    forget_summary(summary_dict[title])
                     if st.session_state.get("selected_summary_title") == title:
-                        if "selected_summary" in st.session_state:
-                            del st.session_state["selected_summary"]
                         if "selected_summary_title" in st.session_state:
                             del st.session_state["selected_summary_title"]
                         if "selected_summary_id" in st.session_state:
@@ -71,14 +79,76 @@ else:
                     st.success(f"✅ Deleted: {title}")
                     st.rerun()
     
+    st.markdown("---")
+    
+    # Overview across all summaries
+    overview = get_overview(user_id)
+    with st.expander("🌐 All Summaries Overview", expanded=False):
+        if overview.empty:
+            st.info("No quiz attempts yet.")
+        else:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Summaries Attempted", len(overview))
+            with col2:
+                st.metric("Total Attempts", int(overview["attempts"].sum()))
+            with col3:
+                overall = (overview["avg_score"] * overview["attempts"]).sum() / overview["attempts"].sum()
+                st.metric("Overall Average", f"{overall*100:.1f}%")
+            
+            st.markdown("#### ⚠️ Weakest Documents")
+            for _, row in overview.head(3).iterrows():
+                st.write(f"{row['title']} — {row['avg_score']*100:.1f}% ({row['mastery']}, {row['trend']})")
+            
+            display_df = overview[["title", "attempts", "avg_score", "best_score", "mastery", "trend", "last_attempt"]].copy()
+            display_df["avg_score"] = (display_df["avg_score"] * 100).round(1)
+            display_df["best_score"] = (display_df["best_score"] * 100).round(1)
+            display_df.columns = ["Summary", "Attempts", "Average %", "Best %", "Rank", "Trend", "Last Attempt"]
+            st.dataframe(display_df, width='stretch', hide_index=True)
+    
+    # Bulk export of summaries with their quiz history
+    with st.expander("📦 Bulk Export", expanded=False):
+        export_titles = st.multiselect("Summaries to export:", list(summary_dict.keys()),
+                                       default=list(summary_dict.keys()))
+        export_format = st.radio("Format:", ["Zip of PDFs", "Single merged PDF"], horizontal=True)
+        
+        if st.button("Export", use_container_width=True, disabled=not export_titles):
+            merged = export_format == "Single merged PDF"
+            suffix = ".pdf" if merged else ".zip"
+            remove_stale_exports()
+            output_path = tempfile.NamedTemporaryFile(prefix=EXPORT_PREFIX, suffix=suffix, delete=False).name
+            progress = st.progress(0.0, text="Rendering...")
+            errors = export_summaries(
+                output_path,
+                [summary_dict[title] for title in export_titles],
+                merged=merged,
+                on_progress=lambda done, total: progress.progress(done / total, text=f"Rendered {done}/{total}"),
+                user_id=user_id
+            )
+            if errors:
+                st.warning(f"{len(errors)} summary(ies) could not be rendered and were skipped.")
+            # Offered only in the run that made the export: the file is handed to
+            # the download button once and removed, so later reruns don't reload it
+            try:
+                with open(output_path, "rb") as f:
+                    st.download_button(
+                        label="⬇️ Download Export",
+                        data=f,
+                        file_name=f"study_export{suffix}",
+                        mime="application/pdf" if merged else "application/zip",
+                        on_click="ignore",
+                        use_container_width=True
+                    )
+            finally:
+                remove_file(output_path)
    
     # Performance Dashboard (only show if a summary is selected)
     if st.session_state.get("selected_summary_title"):
         selected_id = st.session_state.get("selected_summary_id")
         st.markdown(f"### 📊 Performance Dashboard: {st.session_state.get('selected_summary_title')}")
         
-        stats = get_summary_stats(selected_id)
-        quiz_history = get_quiz_scores_by_summary(selected_id)
+        stats = get_summary_stats(selected_id, user_id)
+        quiz_history = get_quiz_scores_by_summary(selected_id, user_id)
         
         col1, col2, col3, col4 = st.columns(4)
         
@@ -93,15 +163,7 @@ else:
         
         with col4:
             if stats['attempts'] > 0:
-                avg = stats['avg_score']
-                if avg >= 0.9:
-                    mastery = "Platinum ⭐"
-                elif avg >= 0.75:
-                    mastery = "Gold 🏆"
-                elif avg >= 0.6:
-                    mastery = "Silver 🥈"
-                else:
-                    mastery = "Bronze 🥉"
+                mastery = mastery_tier(stats['avg_score'])
             else:
                 mastery = "No Data"
             st.metric("Rank", mastery)
@@ -169,12 +231,14 @@ else:
     st.markdown("---")
     
     # Display Summary Content
-    if st.session_state.get("selected_summary"):
+    summary_content = None
+    if st.session_state.get("selected_summary_id") is not None:
+        summary_content = get_summary_content(st.session_state["selected_summary_id"], user_id)
+    if summary_content:
         st.markdown(f"### 📄 Summary: {st.session_state.get('selected_summary_title')}")
-        st.markdown(st.session_state.get("selected_summary"))
+        st.markdown(summary_content)
         
         # Download button
-        summary_content = st.session_state.get("selected_summary")
         summary_title = st.session_state.get("selected_summary_title")
         
         html_content = markdown2.markdown(summary_content)
@@ -0,0 +1,276 @@
+"""
+Async HTTP API for summaries, quizzes and flashcards.
+
+    python api_server.py --port 8600
+    python api_server.py --fake-model      # local fake backend, no Gemini calls
+
+Generation requests return 202 with a job id right away; poll
+GET /api/jobs/<id> for the result, or pass "wait": <seconds> in the request
+body to get the result inline if it finishes in time. Handlers never block
+the event loop: generation jobs run on a bounded thread pool and database
+reads on a separate one, so slow model calls never hold up listings.
+
+A job that exceeds --job-timeout is reported as failed, but its thread keeps
+running until the model call returns; each model request is cut off after
+the "model_timeout_seconds" setting, so a stuck call holds a worker for at
+most that long per model tried.
+
+    POST /api/summaries    {"title": str, "text": str}
+    POST /api/quizzes      {"summary_id": int} or {"text": str}, optional "num_questions" (1-10)
+    POST /api/flashcards   {"summary_id": int} or {"text": str}
+    GET  /api/summaries
+    GET  /api/summaries/<id>
+    GET  /api/jobs/<id>
+
+Every request needs an "Authorization: Bearer <token>" header; the token
+identifies the user. Issue one with
+
+    python api_server.py --create-token alice@example.com
+
+Summaries of other users answer 404.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.web
+
+from helpers.ai_models import generate_quiz, generate_flashcards, parse_json_response, set_client_factory
+from helpers.db import init_db, get_summary_by_id, get_summary_previews, create_api_token, get_token_user
+from helpers.document_versions import summarize_document
+
+DEFAULT_WORKERS = 8
+DEFAULT_READ_WORKERS = 4
+MAX_QUESTIONS = 10
+MAX_ID = 2 ** 63 - 1  # largest SQLite INTEGER
+DEFAULT_JOB_TIMEOUT = 300
+MAX_WAIT = 60
+MAX_FINISHED_JOBS = 1000
+
+
+class JobManager:
+    """Runs blocking generation calls on a thread pool and tracks their status."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, timeout=DEFAULT_JOB_TIMEOUT, read_workers=DEFAULT_READ_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-job")
+        # Database reads get their own threads so stuck generations can't starve them
+        self.read_executor = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="api-read")
+        self.timeout = timeout
+        self.jobs = OrderedDict()
+        self._tasks = {}
+
+    def submit(self, kind, user_id, fn, *args):
+        job = {"id": uuid.uuid4().hex, "kind": kind, "user_id": user_id, "status": "queued",
+               "created_at": time.time(), "finished_at": None, "result": None, "error": None}
+        self.jobs[job["id"]] = job
+
+        def run():
+            job["status"] = "running"
+            return fn(*args)
+
+        future = asyncio.get_running_loop().run_in_executor(self.executor, run)
+        self._tasks[job["id"]] = asyncio.ensure_future(self._track(job, future))
+        self._evict()
+        return job
+
+    async def _track(self, job, future):
+        try:
+            job["result"] = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            job["status"] = "done"
+        except asyncio.TimeoutError:
+            job["status"] = "failed"
+            job["error"] = f"Timed out after {self.timeout}s"
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = time.time()
+            self._tasks.pop(job["id"], None)
+
+    async def wait(self, job_id, seconds):
+        task = self._tasks.get(job_id)
+        if task is not None and seconds > 0:
+            await asyncio.wait({task}, timeout=min(seconds, MAX_WAIT))
+        return self.jobs.get(job_id)
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job["finished_at"] is not None]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+
+def _summarize(title, text, user_id):
+    summary_id, stats = summarize_document(title, text, user_id)
+    return {"summary_id": summary_id, **stats}
+
+def _quiz(text, num_questions, user_id):
+    return parse_json_response(generate_quiz(text, num_questions=num_questions, user_id=user_id))
+
+def _flashcards(text, user_id):
+    return parse_json_response(generate_flashcards(text, user_id=user_id))
+
+
+class BaseHandler(tornado.web.RequestHandler):
+
+    def initialize(self, jobs):
+        self.jobs = jobs
+        self.user_id = None
+
+    async def prepare(self):
+        scheme, _, token = self.request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and token.strip():
+            self.user_id = await self.run_blocking(get_token_user, token.strip())
+        if self.user_id is None:
+            raise tornado.web.HTTPError(401, reason="A valid bearer token is required")
+
+    def json_body(self):
+        try:
+            body = json.loads(self.request.body or b"{}")
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="Body must be JSON")
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, reason="Body must be a JSON object")
+        return body
+
+    def write_error(self, status_code, **kwargs):
+        self.finish({"error": self._reason})
+
+    def number_arg(self, value, name, cast, low, high):
+        """Client-supplied number, or 400 if it isn't one in [low, high]."""
+        try:
+            number = cast(value)
+        except (TypeError, ValueError):
+            raise tornado.web.HTTPError(400, reason=f"'{name}' must be a number")
+        if not low <= number <= high:
+            raise tornado.web.HTTPError(400, reason=f"'{name}' must be between {low} and {high}")
+        return number
+
+    async def run_blocking(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.jobs.read_executor, fn, *args)
+
+    async def source_text(self, body):
+        """The text to generate from: the user's own summary if "summary_id" is given, else "text"."""
+        if body.get("summary_id") is None:
+            if not body.get("text"):
+                raise tornado.web.HTTPError(400, reason="'summary_id' or 'text' is required")
+            return body["text"]
+        summary_id = self.number_arg(body["summary_id"], "summary_id", int, 0, MAX_ID)
+        content = await self.run_blocking(get_summary_by_id, summary_id, self.user_id)
+        if content is None:
+            raise tornado.web.HTTPError(404, reason="Summary not found")
+        return content
+
+    async def start_job(self, kind, fn, *args):
+        wait = self.number_arg(self.json_body().get("wait") or 0, "wait", float, 0, float("inf"))
+        job = self.jobs.submit(kind, self.user_id, fn, *args)
+        job = await self.jobs.wait(job["id"], wait)
+        self.set_status(200 if job["status"] in ("done", "failed") else 202)
+        self.finish(job)
+
+
+class SummariesHandler(BaseHandler):
+
+    async def get(self):
+        rows = await self.run_blocking(get_summary_previews, self.user_id)
+        self.finish({"summaries": [
+            {"id": sid, "title": title, "preview": preview, "size": size}
+            for sid, title, preview, size in rows
+        ]})
+
+    async def post(self):
+        body = self.json_body()
+        if not body.get("text") or not body.get("title"):
+            raise tornado.web.HTTPError(400, reason="'title' and 'text' are required")
+        await self.start_job("summary", _summarize, body["title"], body["text"], self.user_id)
+
+
+class SummaryHandler(BaseHandler):
+
+    async def get(self, summary_id):
+        summary_id = self.number_arg(summary_id, "summary_id", int, 0, MAX_ID)
+        content = await self.run_blocking(get_summary_by_id, summary_id, self.user_id)
+        if content is None:
+            raise tornado.web.HTTPError(404, reason="Summary not found")
+        self.finish({"id": summary_id, "content": content})
+
+
+class QuizHandler(BaseHandler):
+
+    async def post(self):
+        body = self.json_body()
+        num_questions = self.number_arg(body.get("num_questions", 4), "num_questions", int, 1, MAX_QUESTIONS)
+        text = await self.source_text(body)
+        await self.start_job("quiz", _quiz, text, num_questions, self.user_id)
+
+
+class FlashcardsHandler(BaseHandler):
+
+    async def post(self):
+        text = await self.source_text(self.json_body())
+        await self.start_job("flashcards", _flashcards, text, self.user_id)
+
+
+class JobHandler(BaseHandler):
+
+    async def get(self, job_id):
+        wait = self.number_arg(self.get_query_argument("wait", 0), "wait", float, 0, float("inf"))
+        # Other users' jobs look exactly like unknown ones
+        job = self.jobs.jobs.get(job_id)
+        if job is not None and job["user_id"] == self.user_id:
+            job = await self.jobs.wait(job_id, wait)
+        else:
+            job = None
+        if job is None:
+            raise tornado.web.HTTPError(404, reason="Job not found")
+        self.finish(job)
+
+
+def make_app(workers=DEFAULT_WORKERS, job_timeout=DEFAULT_JOB_TIMEOUT, read_workers=DEFAULT_READ_WORKERS):
+    jobs = JobManager(workers, job_timeout, read_workers)
+    return tornado.web.Application([
+        (r"/api/summaries", SummariesHandler, {"jobs": jobs}),
+        (r"/api/summaries/(\d+)", SummaryHandler, {"jobs": jobs}),
+        (r"/api/quizzes", QuizHandler, {"jobs": jobs}),
+        (r"/api/flashcards", FlashcardsHandler, {"jobs": jobs}),
+        (r"/api/jobs/([0-9a-f]+)", JobHandler, {"jobs": jobs}),
+    ])
+
+async def serve(args):
+    app = make_app(args.workers, args.job_timeout, args.read_workers)
+    app.listen(args.port, address=args.host)
+    print(f"Study assistant API listening on http://{args.host}:{args.port}")
+    await asyncio.Event().wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Async HTTP API for the study assistant.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Threads for generation jobs")
+    parser.add_argument("--read-workers", type=int, default=DEFAULT_READ_WORKERS,
+                        help="Threads for database reads")
+    parser.add_argument("--job-timeout", type=int, default=DEFAULT_JOB_TIMEOUT,
+                        help="Seconds before a generation job is reported as failed")
+    parser.add_argument("--fake-model", action="store_true", help="Use the local fake model backend")
+    parser.add_argument("--create-token", metavar="USER", help="Print a new API token for USER and exit")
+    args = parser.parse_args()
+
+    if args.create_token:
+        init_db()
+        print(create_api_token(args.create_token))
+        return
+
+    if args.fake_model:
+        from helpers.fake_model import FakeClient
+        set_client_factory(lambda user_id: FakeClient())
+
+    init_db()
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Headless ingestion of a directory of PDFs, without Streamlit.
+
+    python batch_ingest.py path/to/course_folder --quiz --flashcards
+
+Files are identified by a hash of their contents and recorded in a checkpoint
+file as soon as they are saved, so re-running after a crash (or on the next
+night) skips everything already processed. A JSON run report is written to
+the output directory.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from helpers import db
+from helpers.ai_models import generate_quiz, generate_flashcards, parse_json_response
+from helpers.batch_upload import process_uploads, get_concurrency_limits, get_max_text_chars
+from helpers.db import init_db, get_summary_by_id, DEFAULT_USER
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_checkpoint(path):
+    if path.exists():
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+def save_checkpoint(path, checkpoint):
+    # Write then rename so a crash never leaves a half-written checkpoint
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp, path)
+
+def _generate_extras(entry, out_dir, quiz, flashcards, user_id):
+    """Generate the quiz/flashcards a checkpoint entry is still missing; returns the updated entry."""
+    content = get_summary_by_id(entry["summary_id"], user_id)
+    if content is None:
+        raise ValueError(f"Summary {entry['summary_id']} no longer exists in the database")
+    stem = str(Path(entry["file"]).with_suffix("")).replace(os.sep, "__")
+    # Output is parsed before it is written, so an empty or malformed response
+    # raises here and the file is retried on the next run instead of checkpointed
+    if quiz and not entry.get("quiz"):
+        path = out_dir / f"{stem}.quiz.json"
+        path.write_text(json.dumps(parse_json_response(generate_quiz(content, user_id=user_id)), indent=2),
+                        encoding="utf-8")
+        entry["quiz"] = str(path)
+    if flashcards and not entry.get("flashcards"):
+        path = out_dir / f"{stem}.flashcards.json"
+        path.write_text(json.dumps(parse_json_response(generate_flashcards(content, user_id=user_id)), indent=2),
+                        encoding="utf-8")
+        entry["flashcards"] = str(path)
+    return entry
+
+def run(args):
+    in_dir = Path(args.input_dir)
+    out_dir = Path(args.output_dir or in_dir / ".study_assistant")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = out_dir / CHECKPOINT_FILE
+    checkpoint = load_checkpoint(checkpoint_path)
+    started = time.time()
+
+    pdfs = sorted(in_dir.rglob("*.pdf") if args.recursive else in_dir.glob("*.pdf"))
+    hashes = {str(path): file_hash(path) for path in pdfs}
+    todo = [path for path in pdfs if hashes[str(path)] not in checkpoint]
+    print(f"{len(pdfs)} PDF(s) found, {len(pdfs) - len(todo)} already processed, {len(todo)} to process")
+
+    names = {str(path): str(path.relative_to(in_dir)) for path in pdfs}
+    results = []
+    reported_failures = set()
+
+    def on_progress(status):
+        # Checkpoint each file the moment it is saved
+        changed = False
+        for path, item in zip(todo, status):
+            digest = hashes[str(path)]
+            if item["stage"] == "Saved" and digest not in checkpoint:
+                checkpoint[digest] = {"file": names[str(path)], "summary_id": item["summary_id"]}
+                changed = True
+                print(f"  saved  {names[str(path)]}  ({item['note']})")
+            elif item["stage"] == "Failed" and digest not in reported_failures:
+                reported_failures.add(digest)
+                print(f"  FAILED {names[str(path)]}: {item['error']}")
+        if changed:
+            save_checkpoint(checkpoint_path, checkpoint)
+
+    if todo:
+        results = process_uploads(
+            [(names[str(path)], str(path)) for path in todo],
+            args.extract_workers, args.summary_workers, on_progress=on_progress,
+            max_chars=args.max_chars, preprocess=not args.no_preprocess, user_id=args.user
+        )
+
+    extras_errors = {}
+    if args.quiz or args.flashcards:
+        pending = [d for d, e in checkpoint.items()
+                   if (args.quiz and not e.get("quiz")) or (args.flashcards and not e.get("flashcards"))]
+        with ThreadPoolExecutor(max_workers=args.generate_workers) as pool:
+            futures = {d: pool.submit(_generate_extras, dict(checkpoint[d]), out_dir,
+                                      args.quiz, args.flashcards, args.user) for d in pending}
+            for digest, future in futures.items():
+                try:
+                    checkpoint[digest] = future.result()
+                    save_checkpoint(checkpoint_path, checkpoint)
+                except Exception as e:
+                    extras_errors[checkpoint[digest]["file"]] = str(e)
+
+    report = {
+        "started_at": datetime.fromtimestamp(started).isoformat(),
+        "duration_seconds": round(time.time() - started, 1),
+        "input_dir": str(in_dir),
+        "found": len(pdfs),
+        "skipped": len(pdfs) - len(todo),
+        "processed": sum(1 for r in results if r["stage"] == "Saved"),
+        "failed": sum(1 for r in results if r["stage"] == "Failed"),
+        "files": results,
+        "generation_errors": extras_errors,
+    }
+    report_path = out_dir / f"run_report_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Done in {report['duration_seconds']}s: {report['processed']} processed, "
+          f"{report['failed']} failed, {report['skipped']} skipped. Report: {report_path}")
+    return 1 if report["failed"] or extras_errors else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a directory of PDFs without the UI.")
+    parser.add_argument("input_dir", help="Directory containing PDF files")
+    parser.add_argument("--output-dir", help="Where to put the checkpoint, reports and generated quizzes "
+                                             "(default: <input_dir>/.study_assistant)")
+    parser.add_argument("--recursive", action="store_true", help="Include PDFs in subdirectories")
+    parser.add_argument("--quiz", action="store_true", help="Also generate a quiz for each summary")
+    parser.add_argument("--flashcards", action="store_true", help="Also generate flashcards for each summary")
+    parser.add_argument("--db", default=db.DB_PATH, help="SQLite database to use (default: the app's database)")
+    parser.add_argument("--extract-workers", type=int, help="Default: the app's upload setting")
+    parser.add_argument("--summary-workers", type=int, help="Default: the app's upload setting")
+    parser.add_argument("--generate-workers", type=int, help="Default: --summary-workers")
+    parser.add_argument("--max-chars", type=int, help="Default: the app's upload setting")
+    parser.add_argument("--no-preprocess", action="store_true", help="Skip header/footer and whitespace cleanup")
+    parser.add_argument("--user", default=DEFAULT_USER, help="User the summaries are saved for")
+    args = parser.parse_args()
+
+    # Only touch the database once the arguments are known (so --help has no side effects)
+    db.DB_PATH = str(Path(args.db).resolve())
+    init_db()
+    extract_workers, summary_workers = get_concurrency_limits()
+    args.extract_workers = args.extract_workers or extract_workers
+    args.summary_workers = args.summary_workers or summary_workers
+    args.generate_workers = args.generate_workers or args.summary_workers
+    args.max_chars = args.max_chars or get_max_text_chars()
+    raise SystemExit(run(args))
+
+
+if __name__ == "__main__":
+    main()
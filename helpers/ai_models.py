@@ -1,23 +1,91 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from google import genai
-import sqlite3
-from pathlib import Path
-DB_PATH = "database/summaries.db"
-def get_api_key():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.execute("SELECT value FROM config WHERE key = 'api_key'")
-    result = cursor.fetchone()
-    conn.close()
-    return result[0] if result else ""
-
-def get_client():
+from helpers.db import get_setting
+from helpers.model_routing import run_routed
+
+DEFAULT_INFLIGHT_WAIT = 300
+DEFAULT_MODEL_TIMEOUT = 300
+
+def get_api_key(user_id=None):
+    """The user's own API key, falling back to the shared one."""
+    return get_setting("api_key", "", user_id=user_id)
+
+# Optional replacement for the Gemini client, e.g. helpers.fake_model.FakeClient for local testing
+_client_factory = None
+
+def set_client_factory(factory):
+    """Use factory(user_id) instead of the Gemini client; pass None to restore Gemini."""
+    global _client_factory
+    _client_factory = factory
+
+def get_client(user_id=None):
     """Create a fresh Gemini client with the current API key from the database."""
-    return genai.Client(api_key=get_api_key())
+    if _client_factory is not None:
+        return _client_factory(user_id)
+    timeout = float(get_setting("model_timeout_seconds", DEFAULT_MODEL_TIMEOUT))
+    return genai.Client(api_key=get_api_key(user_id), http_options={"timeout": int(timeout * 1000)})
+
+# Identical requests that are already running, keyed by a hash of API key + task + prompt
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _single_flight(key, fn, wait):
+    """
+    Run fn() once for concurrent callers with the same key; the others wait up
+    to `wait` seconds and get the same result or exception. A request that has
+    been running longer than `wait` is treated as stuck and no longer joined.
+    """
+    now = time.monotonic()
+    with _inflight_lock:
+        entry = _inflight.get(key)
+        leader = entry is None or now - entry[1] > wait
+        if leader:
+            entry = (Future(), now)
+            _inflight[key] = entry
+    future = entry[0]
+
+    if not leader:
+        try:
+            return future.result(timeout=wait)
+        except FutureTimeoutError:
+            raise TimeoutError(f"Identical request still running after {wait}s")
+
+    try:
+        result = fn()
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _inflight_lock:
+            if _inflight.get(key) is entry:
+                del _inflight[key]
+
+def _call_model(task, contents, user_id):
+    client = get_client(user_id)
+    return run_routed(task, contents,
+                      lambda model: client.models.generate_content(model=model, contents=contents).text)
+
+def _generate(task, contents, user_id=None):
+    """
+    Text of a model response from the model routed for this task and prompt size.
+    Concurrent calls with the same task and prompt share one request, but only
+    when they would send it with the same API key (users with their own key
+    never share a request, or its errors, with anyone else).
+    """
+    key = hashlib.sha256(f"{get_api_key(user_id)}\0{task}\0{contents}".encode("utf-8")).hexdigest()
+    wait = float(get_setting("inflight_wait_seconds", DEFAULT_INFLIGHT_WAIT))
+    return _single_flight(key, lambda: _call_model(task, contents, user_id), wait)
 
-def get_summary(text_extracted):
-    client = get_client()
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=f"""Summarize the following text as structured notes, similar to a README.md file. 
+def get_summary(text_extracted, user_id=None):
+    return _generate("summary", f"""Summarize the following text as structured notes, similar to a README.md file. 
         The summary should cover every concept and key point from the content, and be organized 
         with sections, headers, and bullet points where applicable. Make sure the explanation is clear 
         and concise, and use a simple format for easy readability. For each concept, include:
@@ -30,22 +98,58 @@ def get_summary(text_extracted):
         
         Text to summarize:
 
-    {text_extracted}""",)
-    return response.text
+    {text_extracted}""", user_id)
+
+def get_section_summary(section_text, user_id=None):
+    """Notes for one part of a longer document, meant to be joined with the other parts' notes."""
+    return _generate("summary", f"""Summarize the following part of a longer document as structured notes.
+        The notes for every part are joined into one document, so:
+        
+        - Do NOT add a document title, introduction, overview or conclusion.
+        - Use a "## " heading for each concept, named after the concept itself.
+        - Never use generic headings such as "Key Points", "Summary", "Overview" or "Examples".
+        - Under each heading, give a short description and the important points, facts and
+          examples as bullet points.
+        
+        Format the output in Markdown.
+        
+        Text to summarize:
+
+    {section_text}""", user_id)
+
 
 
+def clean_summary(summary: str) -> str:
+    """Strip a surrounding ```markdown fence if the model added one."""
+    if not summary:
+        return "Summary not available."
+    code_block_match = re.search(
+        r'```(?:markdown|readme)?\s*(.*?)\s*```',
+        summary,
+        re.DOTALL | re.IGNORECASE
+    )
+    if code_block_match:
+        return code_block_match.group(1).strip()
+    return summary
 
-def generate_quiz(extracted_text):
+def generate_quiz(extracted_text, topics=None, num_questions=4, user_id=None):
     """
     Generate quiz questions from text.
+    If topics are given, questions only cover those topics and carry a "topic" field.
     """
-    client = get_client()
+    topic_rules = ""
+    if topics:
+        topic_list = "\n".join(f"        - {topic}" for topic in topics)
+        topic_rules = f"""
+        Only ask about these topics:
+{topic_list}
+        Add a "topic" field to every quiz item with the exact topic name (from the list above) it covers.
+        """
     
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=f"""
-        Generate 4 multiple-choice quiz from the following:
+    text = _generate("quiz", f"""
+        Generate {num_questions} multiple-choice quiz from the following:
         {extracted_text}
+        {topic_rules}
         
         Output rules (follow strictly):
         - Output ONLY a valid JSON array.
@@ -72,19 +176,20 @@ def generate_quiz(extracted_text):
         Constraints:
         - Exactly 4 options: A, B, C, D.
         - The array may contain multiple quiz items upto 10.
-        """
-    )
+        """, user_id)
 
-    if not response.text:
+    if not text:
         return "Gemini Model returned None/Null"
 
-    return response.text.strip()
+    return text.strip()
 
-def generate_flashcards(extracted_text):
-    client = get_client()
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=f"""
+def parse_json_response(text):
+    """Parse a JSON model response, tolerating a surrounding ```json fence."""
+    cleaned = re.sub(r'^```(?:json)?\s*|\s*```$', '', text.strip(), flags=re.IGNORECASE)
+    return json.loads(cleaned)
+
+def generate_flashcards(extracted_text, user_id=None):
+    text = _generate("flashcards", f"""
         Generate a flashcards from the following:
         {extracted_text}
         Output rules (follow strictly):
@@ -102,9 +207,8 @@ def generate_flashcards(extracted_text):
             "answer": "string"
         }}
         ]
-        """
-    )
-    if not response.text:
+        """, user_id)
+    if not text:
         return "Gemini Model returned None/Null"
 
-    return response.text.strip()
+    return text.strip()
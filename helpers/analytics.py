@@ -0,0 +1,58 @@
+import threading
+import numpy as np
+import pandas as pd
+from helpers.db import get_all_summary_stats, get_scores_version, DEFAULT_USER
+
+# (minimum average score, label), checked from the top down
+MASTERY_TIERS = [(0.9, "Platinum ⭐"), (0.75, "Gold 🏆"), (0.6, "Silver 🥈")]
+DEFAULT_TIER = "Bronze 🥉"
+TREND_THRESHOLD = 0.05
+RECENT_ATTEMPTS = 5
+
+# user_id -> (scores version, overview)
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def mastery_tier(avg_score: float) -> str:
+    for threshold, label in MASTERY_TIERS:
+        if avg_score >= threshold:
+            return label
+    return DEFAULT_TIER
+
+def _compute_overview(user_id: str) -> pd.DataFrame:
+    df = pd.DataFrame(
+        get_all_summary_stats(RECENT_ATTEMPTS, user_id),
+        columns=["summary_id", "title", "attempts", "avg_score", "best_score", "recent_avg", "last_attempt"]
+    )
+    if df.empty:
+        return df
+
+    avg = df["avg_score"].to_numpy()
+    df["mastery"] = np.select([avg >= t for t, _ in MASTERY_TIERS], [label for _, label in MASTERY_TIERS],
+                              default=DEFAULT_TIER)
+
+    # Trend: recent attempts compared with the all-time average
+    delta = (df["recent_avg"] - df["avg_score"]).to_numpy()
+    df["trend"] = np.select([delta > TREND_THRESHOLD, delta < -TREND_THRESHOLD],
+                            ["📈 Improving", "📉 Declining"], default="➡️ Steady")
+    df["last_attempt"] = pd.to_datetime(df["last_attempt"])
+    return df.sort_values("avg_score").reset_index(drop=True)
+
+def get_overview(user_id: str = DEFAULT_USER) -> pd.DataFrame:
+    """
+    Stats, mastery tier and trend for each of the user's attempted summaries, weakest first.
+
+    Cached per process and recomputed only after a quiz score is saved or a
+    summary is deleted.
+    """
+    version = get_scores_version()
+    with _cache_lock:
+        cached = _cache.get(user_id)
+        if cached and cached[0] == version:
+            return cached[1]
+
+    overview = _compute_overview(user_id)
+    with _cache_lock:
+        _cache[user_id] = (version, overview)
+    return overview
@@ -0,0 +1,152 @@
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple
+
+from helpers.db import save_source_text, get_setting, DEFAULT_USER
+from helpers.document_versions import summarize_document
+from helpers.pdf_extraction import extract_pdf_to_file, remove_file, DEFAULT_MAX_TEXT_CHARS
+
+DEFAULT_EXTRACT_WORKERS = 2
+DEFAULT_SUMMARY_WORKERS = 4
+# Extraction attempts per file when a worker process dies (e.g. killed for
+# memory). Retries run one at a time, so a PDF that crashes its worker again
+# is identified and fails alone
+MAX_EXTRACT_ATTEMPTS = 2
+
+
+def get_concurrency_limits() -> Tuple[int, int]:
+    """Return (extract_workers, summary_workers) from the config table."""
+    extract_workers = int(get_setting("extract_workers", DEFAULT_EXTRACT_WORKERS))
+    summary_workers = int(get_setting("summary_workers", DEFAULT_SUMMARY_WORKERS))
+    return max(1, extract_workers), max(1, summary_workers)
+
+def get_max_text_chars() -> int:
+    return max(1, int(get_setting("max_text_chars", DEFAULT_MAX_TEXT_CHARS)))
+
+def _summarize_and_save(name: str, extraction: Dict, user_id: str, call_limit) -> Tuple[int, Dict]:
+    try:
+        with open(extraction["text_path"], encoding="utf-8") as f:
+            text = f.read()
+    finally:
+        remove_file(extraction["text_path"])
+
+    if not text:
+        raise ValueError("No text could be extracted from this PDF.")
+    summary_id, stats = summarize_document(name, text, user_id, call_limit)
+    save_source_text(summary_id, text, extraction["pages_read"], extraction["truncated"])
+    return summary_id, stats
+
+def _extraction_note(extraction: Dict, max_chars: int) -> str:
+    note = f"{extraction['pages_read']}/{extraction['total_pages']} pages, {extraction['chars']:,} chars"
+    if extraction["truncated"]:
+        note += f" (truncated at {max_chars:,} char limit)"
+    stats = extraction.get("token_stats")
+    if stats:
+        note += (f"; ~{stats['original_tokens']:,} → {stats['cleaned_tokens']:,} tokens "
+                 f"(-{stats['saved_ratio']:.0%})")
+    return note
+
+def process_uploads(
+    files: List[Tuple[str, str]],
+    extract_workers: int = DEFAULT_EXTRACT_WORKERS,
+    summary_workers: int = DEFAULT_SUMMARY_WORKERS,
+    on_progress: Optional[Callable[[List[Dict]], None]] = None,
+    start_page: int = 1,
+    end_page: Optional[int] = None,
+    max_chars: int = DEFAULT_MAX_TEXT_CHARS,
+    preprocess: bool = True,
+    user_id: str = DEFAULT_USER,
+) -> List[Dict]:
+    """
+    Extract, summarize and save a batch of PDFs given as (name, path on disk).
+
+    Extraction runs in a process pool and summarization in a thread pool; a file
+    moves to summarization as soon as its extraction finishes, so both stages
+    overlap. Extracted text is cleaned of headers, footers and other noise
+    (unless `preprocess` is off) and goes through a temporary file rather than
+    being passed back in memory. A failure in one file is recorded in its status and
+    the rest of the batch carries on. If an extraction worker dies, the pool is
+    recreated and the unfinished extractions are retried one at a time. `on_progress` is always called from the
+    calling thread. At most `summary_workers` model requests run at once,
+    counting the sections of every document being summarized.
+    """
+    status = [{"file": name, "stage": "Queued", "summary_id": None, "note": None,
+               "token_stats": None, "error": None}
+              for name, _ in files]
+
+    def report(idx, stage, **fields):
+        status[idx]["stage"] = stage
+        status[idx].update(fields)
+        if on_progress:
+            on_progress(status)
+
+    if on_progress:
+        on_progress(status)
+
+    # Documents split into sections that are summarized concurrently, so the
+    # limit is on model calls rather than on documents
+    call_limit = threading.BoundedSemaphore(summary_workers)
+
+    extract_pool = ProcessPoolExecutor(max_workers=extract_workers)
+    # Pool each extraction was submitted to, to recreate a broken pool only once
+    extract_pools = {}
+    attempts = [0] * len(files)
+    retries = deque()
+    pending = {}
+
+    def submit_extract(idx):
+        path = files[idx][1]
+        future = extract_pool.submit(extract_pdf_to_file, path, start_page, end_page, max_chars, preprocess)
+        extract_pools[future] = extract_pool
+        attempts[idx] += 1
+        pending[future] = ("extract", idx)
+
+    try:
+        with ThreadPoolExecutor(max_workers=summary_workers) as summary_pool:
+            for idx in range(len(files)):
+                submit_extract(idx)
+                report(idx, "Extracting")
+
+            while pending or retries:
+                if retries and all(stage != "extract" for stage, _ in pending.values()):
+                    submit_extract(retries.popleft())
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, idx = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool as e:
+                        # A dead worker fails every queued extraction, not just its own
+                        if extract_pools[future] is extract_pool:
+                            extract_pool.shutdown(wait=False, cancel_futures=True)
+                            extract_pool = ProcessPoolExecutor(max_workers=extract_workers)
+                        if attempts[idx] < MAX_EXTRACT_ATTEMPTS:
+                            retries.append(idx)
+                            report(idx, "Extracting", note="Retrying after a worker crash")
+                        else:
+                            report(idx, "Failed", error=f"Extraction worker crashed: {e}")
+                        continue
+                    except Exception as e:
+                        report(idx, "Failed", error=str(e))
+                        continue
+                    finally:
+                        extract_pools.pop(future, None)
+
+                    if stage == "extract":
+                        name = status[idx]["file"]
+                        pending[summary_pool.submit(_summarize_and_save, name, result, user_id, call_limit)] = ("summary", idx)
+                        report(idx, "Summarizing", note=_extraction_note(result, max_chars),
+                               token_stats=result.get("token_stats"))
+                    else:
+                        summary_id, stats = result
+                        note = status[idx]["note"]
+                        if stats["version"] > 1:
+                            note += (f"; v{stats['version']}, reused {stats['reused_sections']}"
+                                     f"/{stats['sections']} sections")
+                        report(idx, "Saved", summary_id=summary_id, note=note)
+    finally:
+        extract_pool.shutdown()
+
+    return status
@@ -0,0 +1,137 @@
+import glob
+import html
+import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Optional
+
+import markdown2
+from PyPDF2 import PdfWriter
+from weasyprint import HTML
+
+from helpers.db import get_summary_by_id, get_quiz_scores_by_summary, get_all_summaries, DEFAULT_USER
+
+# Workers are recycled after this many documents so WeasyPrint memory doesn't pile up
+TASKS_PER_WORKER = 20
+
+# Export files in the temp directory start with this; leftovers older than
+# STALE_EXPORT_SECONDS (e.g. from a crashed session) are removed
+EXPORT_PREFIX = "study_export_"
+STALE_EXPORT_SECONDS = 3600
+
+
+def build_summary_html(title, content, quiz_history):
+    parts = [f"<h1>{html.escape(title)}</h1>", markdown2.markdown(content or "")]
+    if quiz_history:
+        rows = "".join(
+            f"<tr><td>{html.escape(timestamp[:16].replace('T', ' '))}</td>"
+            f"<td>{score * 100:.1f}%</td><td>{total}</td></tr>"
+            for score, total, timestamp in quiz_history
+        )
+        parts.append(
+            "<h2>Quiz History</h2>"
+            "<table><tr><th>Date</th><th>Score</th><th>Questions</th></tr>"
+            f"{rows}</table>"
+        )
+    return "\n".join(parts)
+
+def render_summary_pdf(summary_id, title, out_dir, user_id=DEFAULT_USER):
+    """Render one summary and its quiz history to a PDF in out_dir. Runs in a worker process."""
+    content = get_summary_by_id(summary_id, user_id)
+    quiz_history = get_quiz_scores_by_summary(summary_id, user_id)
+    path = os.path.join(out_dir, f"{summary_id}.pdf")
+    HTML(string=build_summary_html(title, content, quiz_history)).write_pdf(path)
+    return path
+
+def remove_stale_exports(max_age=STALE_EXPORT_SECONDS):
+    cutoff = time.time() - max_age
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), EXPORT_PREFIX + "*")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+def _archive_name(title, summary_id):
+    safe = "".join(ch if ch.isalnum() or ch in " ._-" else "_" for ch in title).strip() or "summary"
+    safe = safe[:-4] if safe.lower().endswith(".pdf") else safe
+    return f"{summary_id:04d} - {safe}.pdf"
+
+def export_summaries(
+    output_path: str,
+    summary_ids: Optional[List[int]] = None,
+    merged: bool = False,
+    workers: Optional[int] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    user_id: str = DEFAULT_USER,
+) -> Dict[int, str]:
+    """
+    Render summaries with their quiz history to PDF in parallel worker
+    processes and write them to `output_path` on disk. Only the user's own
+    summaries are exported.
+
+    By default each document is streamed into a zip archive as soon as it is
+    rendered, and at most two documents per worker are in flight, so memory
+    stays bounded regardless of the number of summaries. With `merged` the
+    documents are combined into one PDF in summary order; PdfWriter holds
+    every page until the file is written, so memory in that mode grows with
+    the size of the export.
+    `on_progress(done, total)` is called from the calling thread. Returns
+    {summary_id: error} for documents that failed to render.
+    """
+    titles = dict(get_all_summaries(user_id))
+    if summary_ids is None:
+        summary_ids = list(titles)
+    summary_ids = [sid for sid in summary_ids if sid in titles]
+    workers = workers or os.cpu_count() or 1
+    rendered, errors = {}, {}
+    completed = 0
+
+    with tempfile.TemporaryDirectory(prefix="export_") as out_dir, \
+            ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=TASKS_PER_WORKER) as pool:
+        queue = iter(summary_ids)
+        pending = {}
+
+        def submit_next():
+            sid = next(queue, None)
+            if sid is not None:
+                pending[pool.submit(render_summary_pdf, sid, titles[sid], out_dir, user_id)] = sid
+
+        for _ in range(workers * 2):
+            submit_next()
+
+        archive = None if merged else zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED)
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    sid = pending.pop(future)
+                    submit_next()
+                    try:
+                        path = future.result()
+                    except Exception as e:
+                        errors[sid] = str(e)
+                    else:
+                        if archive is not None:
+                            archive.write(path, _archive_name(titles[sid], sid))
+                            os.remove(path)
+                        else:
+                            rendered[sid] = path
+                    completed += 1
+                    if on_progress:
+                        on_progress(completed, len(summary_ids))
+        finally:
+            if archive is not None:
+                archive.close()
+
+        if merged:
+            writer = PdfWriter()
+            for sid in summary_ids:
+                if sid in rendered:
+                    writer.append(rendered[sid])
+            with open(output_path, "wb") as f:
+                writer.write(f)
+
+    return errors
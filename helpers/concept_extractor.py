@@ -16,7 +16,8 @@ class ConceptExtractor:
             if stripped.startswith('##') or stripped.startswith('###'):
                 concept = re.sub(r'^#+\s*', '', stripped).strip()
                 if concept:
-                    concepts[concept] = []
+                    # A heading repeated later in the summary adds to the same concept
+                    concepts.setdefault(concept, [])
                     current_parent = concept
             
             elif current_parent:
@@ -32,16 +33,36 @@ class ConceptExtractor:
         
         return concepts
     
+    def extract_sections(self, text: str) -> Dict[str, str]:
+        """Map each concept header to the markdown under it, up to the next header."""
+        sections = {}
+        current_parent = None
+        
+        for line in text.split('\n'):
+            stripped = line.strip()
+            if stripped.startswith('##') or stripped.startswith('###'):
+                concept = re.sub(r'^#+\s*', '', stripped).strip()
+                if concept:
+                    current_parent = concept
+                    sections.setdefault(concept, [])
+            if current_parent:
+                sections[current_parent].append(line)
+        
+        return {concept: '\n'.join(lines).strip() for concept, lines in sections.items()}
+    
     def build_quiz_topics(self, summary_text: str) -> List[Dict]:
-        concepts = self.dfs_extract_concepts(summary_text)
+        return self.topics_from_concepts(self.dfs_extract_concepts(summary_text))
+    
+    def topics_from_concepts(self, concepts: Dict) -> List[Dict]:
         return [
             {"main": concept}
             for concept in concepts.keys()
         ]
     
     def analyze_concept_relationships(self, summary_text: str) -> Dict:
-        concepts = self.dfs_extract_concepts(summary_text)
-        
+        return self.analysis_from_concepts(self.dfs_extract_concepts(summary_text))
+    
+    def analysis_from_concepts(self, concepts: Dict) -> Dict:
         return {
             "total_main_concepts": len(concepts),
             "total_subconcepts": sum(len(subs) for subs in concepts.values())
@@ -0,0 +1,104 @@
+import sys
+import threading
+from collections import OrderedDict
+
+from helpers.ai_models import parse_json_response
+from helpers.concept_extractor import ConceptExtractor
+from helpers.db import get_summary_by_id, get_generated_set, get_setting, DEFAULT_USER
+
+DEFAULT_CACHE_MB = 64
+
+
+def deep_size(value):
+    """Bytes held by a value and everything it contains (str, list, tuple, dict)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_size(k) + deep_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(deep_size(item) for item in value)
+    return size
+
+class ContentCache:
+    """
+    Process-wide LRU cache bounded by an estimate of the bytes it holds.
+
+    Entries are built by a loader on a miss, so sessions only need to keep ids
+    and every session shares one copy of each document.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, loader, size_of=None):
+        """Cached value for key, built with loader() on a miss; sized with deep_size unless size_of is given."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+
+        value = loader()
+        if value is None:
+            return None
+        size = (size_of or deep_size)(value)
+        with self._lock:
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = (value, size)
+                self.size += size
+                while self.size > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self.size -= evicted_size
+        return value
+
+    def invalidate_where(self, predicate):
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self.size -= self._entries.pop(key)[1]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_extractor = ConceptExtractor()
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            max_mb = float(get_setting("content_cache_mb", DEFAULT_CACHE_MB))
+            _cache = ContentCache(int(max_mb * 1024 * 1024))
+        return _cache
+
+# Summaries are never edited in place (a revision is saved as a new id), so the
+# id alone identifies a version of the content. Every key starts with
+# (kind, summary_id, user_id): the user is part of the key so one user's cached
+# entry is never served to another, and a deleted summary's entries can be
+# dropped together.
+
+def get_summary_content(summary_id, user_id=DEFAULT_USER):
+    return get_cache().get(("summary", summary_id, user_id), lambda: get_summary_by_id(summary_id, user_id))
+
+def get_concept_tree(summary_id, user_id=DEFAULT_USER):
+    """ConceptExtractor.dfs_extract_concepts of a summary, parsed once per process."""
+    content = get_summary_content(summary_id, user_id)
+    if content is None:
+        return None
+    return get_cache().get(
+        ("concepts", summary_id, user_id),
+        lambda: _extractor.dfs_extract_concepts(content)
+    )
+
+def get_generated_text(summary_id, set_id, user_id=DEFAULT_USER):
+    return get_cache().get(("generated", summary_id, user_id, set_id), lambda: get_generated_set(set_id, user_id))
+
+def get_parsed_set(summary_id, set_id, user_id=DEFAULT_USER):
+    """A generated quiz or flashcard set as parsed JSON (fences allowed). Raises ValueError if it isn't JSON."""
+    text = get_generated_text(summary_id, set_id, user_id)
+    if text is None:
+        return None
+    return get_cache().get(("parsed", summary_id, user_id, set_id), lambda: parse_json_response(text))
+
+def forget_summary(summary_id):
+    """Drop everything cached for a deleted summary (SQLite may reuse its id)."""
+    get_cache().invalidate_where(lambda key: key[1] == summary_id)
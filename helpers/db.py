@@ -1,16 +1,84 @@
+import hashlib
+import os
+import secrets
 import sqlite3
+import threading
+import zlib
 from datetime import datetime
 from pathlib import Path
+from helpers.db_writer import DBWriter
 
-DB_PATH = "database/summaries.db"
+# Resolved against the project root so scripts run from any directory use the app's database
+DB_PATH = str(Path(__file__).resolve().parent.parent / "database" / "summaries.db")
+DEFAULT_USER = "default"
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    """Return this process's single writer for DB_PATH, starting it on first use."""
+    global _writer, _writer_pid
+    with _writer_lock:
+        if _writer is None or _writer_pid != os.getpid() or _writer.db_path != DB_PATH:
+            _writer = DBWriter(DB_PATH)
+            _writer_pid = os.getpid()
+        return _writer
+
+def _write(write):
+    return get_writer().execute(write)
+
+# Bumped on every write to quiz_scores so cached analytics know when to refresh
+_scores_version = 0
+
+def get_scores_version():
+    return _scores_version
+
+def _bump_scores_version():
+    global _scores_version
+    _scores_version += 1
+
+# Text values at least this long are stored zlib-compressed as BLOBs
+COMPRESS_MIN_SIZE = 1024
+PREVIEW_LENGTH = 200
+
+def _compress(text):
+    if text is None or len(text) < COMPRESS_MIN_SIZE:
+        return text
+    return zlib.compress(text.encode("utf-8"))
+
+def _decompress(value):
+    # Rows written before compression was added are plain TEXT
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode("utf-8")
+    return value
+
+def _make_preview(content):
+    return " ".join((content or "").split())[:PREVIEW_LENGTH]
+
+def _add_column(c, table, column, definition):
+    columns = [row[1] for row in c.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
 
 def init_db():
     Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    # WAL lets readers run while the writer thread commits
+    conn.execute("PRAGMA journal_mode=WAL")
     c = conn.cursor()
     
     c.execute('''CREATE TABLE IF NOT EXISTS summaries
                  (id INTEGER PRIMARY KEY, title TEXT, content TEXT, created_at TEXT)''')
+    # Document versioning: revisions of the same file link to the previous version
+    _add_column(c, "summaries", "source_name", "TEXT")
+    _add_column(c, "summaries", "version", "INTEGER DEFAULT 1")
+    _add_column(c, "summaries", "parent_id", "INTEGER")
+    # Per-user scoping: every listing and lookup filters on user_id first
+    _add_column(c, "summaries", "user_id", f"TEXT NOT NULL DEFAULT '{DEFAULT_USER}'")
+    c.execute("DROP INDEX IF EXISTS idx_summaries_source")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_summaries_user ON summaries(user_id, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_summaries_user_source ON summaries(user_id, source_name, version)")
     
     c.execute('''CREATE TABLE IF NOT EXISTS quiz_scores
                  (id INTEGER PRIMARY KEY, 
@@ -19,65 +87,271 @@ def init_db():
                   total_questions INTEGER,
                   timestamp TEXT,
                   FOREIGN KEY(summary_id) REFERENCES summaries(id))''')
+    # Covering index so per-summary aggregates never touch the table rows
+    c.execute("CREATE INDEX IF NOT EXISTS idx_quiz_scores_summary ON quiz_scores(summary_id, timestamp, score)")
+    _add_column(c, "quiz_scores", "user_id", f"TEXT NOT NULL DEFAULT '{DEFAULT_USER}'")
+    c.execute("""CREATE INDEX IF NOT EXISTS idx_quiz_scores_user
+                 ON quiz_scores(user_id, summary_id, timestamp, score)""")
+
+    # One row per answered question of an attempt, tagged with the concept it covers
+    c.execute('''CREATE TABLE IF NOT EXISTS quiz_answers
+                 (id INTEGER PRIMARY KEY,
+                  attempt_id INTEGER,
+                  summary_id INTEGER,
+                  user_id TEXT,
+                  question_index INTEGER,
+                  topic TEXT,
+                  tier TEXT,
+                  correct INTEGER,
+                  answered_at TEXT,
+                  FOREIGN KEY(attempt_id) REFERENCES quiz_scores(id))''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_quiz_answers_attempt ON quiz_answers(attempt_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_quiz_answers_topic ON quiz_answers(user_id, summary_id, topic)")
+
+    # Running per-concept totals, updated with every attempt so mastery is a key lookup
+    c.execute('''CREATE TABLE IF NOT EXISTS concept_mastery
+                 (user_id TEXT,
+                  summary_id INTEGER,
+                  topic TEXT,
+                  answered INTEGER,
+                  correct INTEGER,
+                  last_answered TEXT,
+                  PRIMARY KEY(user_id, summary_id, topic))''')
  
+    c.execute('''CREATE TABLE IF NOT EXISTS source_texts
+                 (summary_id INTEGER PRIMARY KEY,
+                  content TEXT,
+                  pages_read INTEGER,
+                  truncated INTEGER,
+                  FOREIGN KEY(summary_id) REFERENCES summaries(id))''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS summary_sections
+                 (summary_id INTEGER,
+                  section_index INTEGER,
+                  fingerprint TEXT,
+                  content TEXT,
+                  PRIMARY KEY(summary_id, section_index),
+                  FOREIGN KEY(summary_id) REFERENCES summaries(id))''')
+
+    # Small per-summary metadata kept apart from the body so listings never read it
+    c.execute('''CREATE TABLE IF NOT EXISTS summary_meta
+                 (summary_id INTEGER PRIMARY KEY,
+                  preview TEXT,
+                  content_size INTEGER,
+                  FOREIGN KEY(summary_id) REFERENCES summaries(id))''')
+    _backfill_compression(c)
+
     c.execute("""
         CREATE TABLE IF NOT EXISTS config (
             key TEXT PRIMARY KEY,
             value TEXT
         )
     """)
+
+    # Generated quizzes and flashcards, so sessions only need to hold their id
+    c.execute('''CREATE TABLE IF NOT EXISTS generated_sets
+                 (id INTEGER PRIMARY KEY,
+                  summary_id INTEGER,
+                  kind TEXT,
+                  content TEXT,
+                  created_at TEXT,
+                  FOREIGN KEY(summary_id) REFERENCES summaries(id))''')
+
+    # One row per model request, so routing thresholds can be tuned from real latencies
+    c.execute('''CREATE TABLE IF NOT EXISTS model_calls
+                 (id INTEGER PRIMARY KEY,
+                  task TEXT,
+                  model TEXT,
+                  input_tokens INTEGER,
+                  seconds REAL,
+                  ok INTEGER,
+                  created_at TEXT)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_model_calls_route ON model_calls(task, model)")
+
+    c.execute('''CREATE TABLE IF NOT EXISTS user_settings
+                 (user_id TEXT,
+                  key TEXT,
+                  value TEXT,
+                  PRIMARY KEY(user_id, key))''')
+
+    # Bearer tokens for the HTTP API; only a hash of each token is stored
+    c.execute('''CREATE TABLE IF NOT EXISTS api_tokens
+                 (token_hash TEXT PRIMARY KEY,
+                  user_id TEXT,
+                  created_at TEXT)''')
     conn.commit()
     conn.close()
 
 
 
-def save_summary(title, content):
+def _backfill_compression(c):
+    """Compress summaries stored before compression existed and give them metadata."""
+    c.execute("""SELECT id, content FROM summaries
+                 WHERE id NOT IN (SELECT summary_id FROM summary_meta)""")
+    for summary_id, value in c.fetchall():
+        content = _decompress(value)
+        c.execute("UPDATE summaries SET content = ? WHERE id = ?", (_compress(content), summary_id))
+        c.execute("INSERT INTO summary_meta (summary_id, preview, content_size) VALUES (?, ?, ?)",
+                  (summary_id, _make_preview(content), len(content or "")))
+
+def save_summary(title, content, source_name=None, version=1, parent_id=None, user_id=DEFAULT_USER):
+    compressed = _compress(content)
+
+    def write(conn):
+        c = conn.cursor()
+        c.execute("""INSERT INTO summaries
+                     (title, content, created_at, source_name, version, parent_id, user_id)
+                     VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                  (title, compressed, datetime.now().isoformat(), source_name, version, parent_id, user_id))
+        summary_id = c.lastrowid
+        c.execute("INSERT INTO summary_meta (summary_id, preview, content_size) VALUES (?, ?, ?)",
+                  (summary_id, _make_preview(content), len(content or "")))
+        return summary_id
+
+    return _write(write)
+
+def save_source_text(summary_id, content, pages_read=None, truncated=False):
+    """Persist the extracted text a summary was generated from."""
+    row = (summary_id, _compress(content), pages_read, int(bool(truncated)))
+    _write(lambda conn: conn.execute("""INSERT OR REPLACE INTO source_texts
+                                        (summary_id, content, pages_read, truncated)
+                                        VALUES (?, ?, ?, ?)""", row))
+
+def get_source_text(summary_id, user_id=DEFAULT_USER):
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    c.execute("INSERT INTO summaries (title, content, created_at) VALUES (?, ?, ?)",
-              (title, content, datetime.now().isoformat()))
-    conn.commit()
+    c.execute("""SELECT t.content FROM source_texts t
+                 JOIN summaries s ON s.id = t.summary_id
+                 WHERE t.summary_id = ? AND s.user_id = ?""", (summary_id, user_id))
+    result = c.fetchone()
+    conn.close()
+    return _decompress(result[0]) if result else None
+
+def get_latest_version(source_name, user_id=DEFAULT_USER):
+    """Return (id, version) of the user's newest summary of a document, or None."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("""SELECT id, version FROM summaries
+                 WHERE user_id = ? AND source_name = ?
+                 ORDER BY version DESC LIMIT 1""", (user_id, source_name))
+    result = c.fetchone()
+    conn.close()
+    return result
+
+def save_summary_sections(summary_id, sections):
+    """Store (fingerprint, content) section summaries in document order."""
+    rows = [(summary_id, idx, fingerprint, _compress(content))
+            for idx, (fingerprint, content) in enumerate(sections)]
+    _write(lambda conn: conn.executemany("""INSERT OR REPLACE INTO summary_sections
+                                            (summary_id, section_index, fingerprint, content)
+                                            VALUES (?, ?, ?, ?)""", rows))
+
+def get_summary_sections(summary_id, user_id=DEFAULT_USER):
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("""SELECT x.fingerprint, x.content FROM summary_sections x
+                 JOIN summaries s ON s.id = x.summary_id
+                 WHERE x.summary_id = ? AND s.user_id = ?
+                 ORDER BY x.section_index""", (summary_id, user_id))
+    sections = [(fingerprint, _decompress(content)) for fingerprint, content in c.fetchall()]
     conn.close()
+    return sections
 
-def get_all_summaries():
+def get_all_summaries(user_id=DEFAULT_USER):
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    c.execute("SELECT id, title FROM summaries ORDER BY created_at DESC")
+    # id follows insertion order; sorting on it avoids reading created_at, which sits after the body
+    c.execute("SELECT id, title FROM summaries WHERE user_id = ? ORDER BY id DESC", (user_id,))
     summaries = c.fetchall()
     conn.close()
     return summaries
 
-def get_summary_by_id(summary_id):
+def get_summary_by_id(summary_id, user_id=DEFAULT_USER):
+    """The summary's content, or None if it doesn't exist or belongs to another user."""
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    c.execute("SELECT content FROM summaries WHERE id = ?", (summary_id,))
+    c.execute("SELECT content FROM summaries WHERE id = ? AND user_id = ?", (summary_id, user_id))
     result = c.fetchone()
     conn.close()
-    return result[0] if result else None
+    return _decompress(result[0]) if result else None
+
+def get_summary_previews(user_id=DEFAULT_USER):
+    """Return (id, title, preview, content_size) for the user's summaries without reading bodies."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("""SELECT s.id, s.title, m.preview, m.content_size
+                 FROM summaries s
+                 LEFT JOIN summary_meta m ON m.summary_id = s.id
+                 WHERE s.user_id = ?
+                 ORDER BY s.id DESC""", (user_id,))
+    previews = c.fetchall()
+    conn.close()
+    return previews
+
+def save_quiz_score(summary_id, score, total_questions, user_id=DEFAULT_USER, answers=None):
+    """
+    Save a quiz attempt and return its id. `answers` is an optional list of
+    {"question_index", "topic", "tier", "correct"} dicts; they are written in
+    the same transaction and folded into concept_mastery.
+    """
+    now = datetime.now().isoformat()
+    row = (summary_id, score, total_questions, now, user_id)
+    answers = answers or []
+
+    totals = {}
+    for answer in answers:
+        if answer.get("topic"):
+            answered, correct = totals.get(answer["topic"], (0, 0))
+            totals[answer["topic"]] = (answered + 1, correct + (1 if answer["correct"] else 0))
+
+    def write(conn):
+        c = conn.cursor()
+        c.execute("""INSERT INTO quiz_scores 
+                     (summary_id, score, total_questions, timestamp, user_id) 
+                     VALUES (?, ?, ?, ?, ?)""", row)
+        attempt_id = c.lastrowid
+        c.executemany("""INSERT INTO quiz_answers
+                         (attempt_id, summary_id, user_id, question_index, topic, tier, correct, answered_at)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                      [(attempt_id, summary_id, user_id, a["question_index"], a.get("topic"), a.get("tier"),
+                        1 if a["correct"] else 0, now) for a in answers])
+        c.executemany("""INSERT INTO concept_mastery (user_id, summary_id, topic, answered, correct, last_answered)
+                         VALUES (?, ?, ?, ?, ?, ?)
+                         ON CONFLICT(user_id, summary_id, topic) DO UPDATE SET
+                             answered = answered + excluded.answered,
+                             correct = correct + excluded.correct,
+                             last_answered = excluded.last_answered""",
+                      [(user_id, summary_id, topic, answered, correct, now)
+                       for topic, (answered, correct) in totals.items()])
+        return attempt_id
 
-def save_quiz_score(summary_id, score, total_questions):
+    attempt_id = _write(write)
+    _bump_scores_version()
+    return attempt_id
 
+def get_concept_mastery(summary_id, user_id=DEFAULT_USER):
+    """{topic: (answered, correct)} for every concept of a summary the user has answered questions on."""
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    c.execute("""INSERT INTO quiz_scores 
-                 (summary_id, score, total_questions, timestamp) 
-                 VALUES (?, ?, ?, ?)""",
-              (summary_id, score, total_questions, datetime.now().isoformat()))
-    conn.commit()
+    c.execute("""SELECT topic, answered, correct
+                 FROM concept_mastery
+                 WHERE user_id = ? AND summary_id = ?""", (user_id, summary_id))
+    mastery = {topic: (answered, correct) for topic, answered, correct in c.fetchall()}
     conn.close()
+    return mastery
 
-def get_quiz_scores_by_summary(summary_id):
+def get_quiz_scores_by_summary(summary_id, user_id=DEFAULT_USER):
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     c.execute("""SELECT score, total_questions, timestamp 
                  FROM quiz_scores 
-                 WHERE summary_id = ? 
-                 ORDER BY timestamp DESC""", (summary_id,))
+                 WHERE user_id = ? AND summary_id = ? 
+                 ORDER BY timestamp DESC""", (user_id, summary_id))
     scores = c.fetchall()
     conn.close()
     return scores
 
-def get_summary_stats(summary_id):
+def get_summary_stats(summary_id, user_id=DEFAULT_USER):
     """Get average score, attempts for a summary"""
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
@@ -86,7 +360,7 @@ def get_summary_stats(summary_id):
                  COUNT(*) as attempts,
                  MAX(score) as best_score
                  FROM quiz_scores 
-                 WHERE summary_id = ?""", (summary_id,))
+                 WHERE user_id = ? AND summary_id = ?""", (user_id, summary_id))
     stats = c.fetchone()
     conn.close()
     return {
@@ -97,12 +371,127 @@ def get_summary_stats(summary_id):
 
 
 
-def delete_summary(summary_id):
+def save_generated_set(summary_id, kind, content):
+    """Store a generated quiz or flashcard set ("quiz" / "flashcards") and return its id."""
+    row = (summary_id, kind, _compress(content), datetime.now().isoformat())
+    return _write(lambda conn: conn.execute("""INSERT INTO generated_sets
+                                               (summary_id, kind, content, created_at)
+                                               VALUES (?, ?, ?, ?)""", row).lastrowid)
+
+def get_generated_set(set_id, user_id=DEFAULT_USER):
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    
-    c.execute("DELETE FROM quiz_scores WHERE summary_id = ?", (summary_id,))
-    c.execute("DELETE FROM summaries WHERE id = ?", (summary_id,))
-    
-    conn.commit()
+    c.execute("""SELECT g.content FROM generated_sets g
+                 JOIN summaries s ON s.id = g.summary_id
+                 WHERE g.id = ? AND s.user_id = ?""", (set_id, user_id))
+    result = c.fetchone()
+    conn.close()
+    return _decompress(result[0]) if result else None
+
+def get_setting(key, default=None, user_id=None):
+    """Read a setting, preferring the user's own value over the global one."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    result = None
+    if user_id is not None:
+        c.execute("SELECT value FROM user_settings WHERE user_id = ? AND key = ?", (user_id, key))
+        result = c.fetchone()
+    if result is None:
+        c.execute("SELECT value FROM config WHERE key = ?", (key,))
+        result = c.fetchone()
     conn.close()
+    return result[0] if result else default
+
+def save_setting(key, value, user_id=None):
+    if user_id is None:
+        _write(lambda conn: conn.execute("INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)",
+                                         (key, str(value))))
+    else:
+        _write(lambda conn: conn.execute("INSERT OR REPLACE INTO user_settings (user_id, key, value) VALUES (?, ?, ?)",
+                                         (user_id, key, str(value))))
+
+def get_all_summary_stats(recent_attempts=5, user_id=DEFAULT_USER):
+    """
+    Per-summary quiz stats for each of the user's summaries with at least one attempt, in one query.
+    Rows are (id, title, attempts, avg_score, best_score, recent_avg, last_attempt).
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("""SELECT s.id, s.title,
+                        COUNT(*) AS attempts,
+                        AVG(q.score) AS avg_score,
+                        MAX(q.score) AS best_score,
+                        (SELECT AVG(score) FROM (
+                             SELECT score FROM quiz_scores
+                             WHERE summary_id = s.id
+                             ORDER BY timestamp DESC LIMIT ?)) AS recent_avg,
+                        MAX(q.timestamp) AS last_attempt
+                 FROM quiz_scores q
+                 JOIN summaries s ON s.id = q.summary_id
+                 WHERE q.user_id = ?
+                 GROUP BY s.id, s.title""", (recent_attempts, user_id))
+    stats = c.fetchall()
+    conn.close()
+    return stats
+
+def delete_summary(summary_id, user_id=DEFAULT_USER):
+    """Delete one of the user's summaries and everything attached to it; returns False if it isn't theirs."""
+    def write(conn):
+        c = conn.cursor()
+        c.execute("SELECT 1 FROM summaries WHERE id = ? AND user_id = ?", (summary_id, user_id))
+        if c.fetchone() is None:
+            return False
+        c.execute("DELETE FROM quiz_scores WHERE summary_id = ?", (summary_id,))
+        c.execute("DELETE FROM quiz_answers WHERE summary_id = ?", (summary_id,))
+        c.execute("DELETE FROM concept_mastery WHERE summary_id = ?", (summary_id,))
+        c.execute("DELETE FROM source_texts WHERE summary_id = ?", (summary_id,))
+        c.execute("DELETE FROM summary_sections WHERE summary_id = ?", (summary_id,))
+        c.execute("DELETE FROM summary_meta WHERE summary_id = ?", (summary_id,))
+        c.execute("DELETE FROM generated_sets WHERE summary_id = ?", (summary_id,))
+        c.execute("DELETE FROM summaries WHERE id = ?", (summary_id,))
+        return True
+
+    deleted = _write(write)
+    _bump_scores_version()
+    return deleted
+
+def save_model_call(task, model, input_tokens, seconds, ok):
+    """Record one model request without waiting for the commit."""
+    get_writer().submit(lambda conn: conn.execute(
+        "INSERT INTO model_calls (task, model, input_tokens, seconds, ok, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (task, model, input_tokens, seconds, 1 if ok else 0, datetime.now().isoformat())
+    ))
+
+def get_model_call_stats():
+    """Rows of (task, model, calls, failures, avg_seconds, max_seconds, avg_input_tokens) per route."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("""SELECT task, model, COUNT(*), SUM(1 - ok),
+                        AVG(CASE WHEN ok THEN seconds END), MAX(CASE WHEN ok THEN seconds END),
+                        AVG(input_tokens)
+                 FROM model_calls
+                 GROUP BY task, model
+                 ORDER BY task, model""")
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+def _hash_token(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def create_api_token(user_id):
+    """Issue a new API token for the user and return it; it can't be read back later."""
+    token = secrets.token_urlsafe(32)
+    row = (_hash_token(token), user_id, datetime.now().isoformat())
+    _write(lambda conn: conn.execute("INSERT INTO api_tokens (token_hash, user_id, created_at) VALUES (?, ?, ?)",
+                                     row))
+    return token
+
+def get_token_user(token):
+    """The user an API token was issued to, or None if the token is unknown."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("SELECT user_id FROM api_tokens WHERE token_hash = ?", (_hash_token(token),))
+    result = c.fetchone()
+    conn.close()
+    return result[0] if result else None
@@ -0,0 +1,73 @@
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+
+class DBWriter:
+    """
+    Owns the only write connection to a SQLite database.
+
+    Writes are queued as callables taking the connection. A background thread
+    drains whatever is queued, runs it in one transaction (a group commit) and
+    resolves each caller's future. Every write gets its own savepoint, so one
+    failing write is rolled back and reported without affecting the rest of
+    the batch. The database runs in WAL mode so readers never wait on it.
+    """
+
+    def __init__(self, db_path: str, max_batch: int = 128):
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, write) -> Future:
+        future = Future()
+        self._queue.put((write, future))
+        return future
+
+    def execute(self, write):
+        """Queue a write and wait for it to be committed; returns its result."""
+        return self.submit(write).result()
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit_batch(conn, batch)
+
+    def _commit_batch(self, conn, batch):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for write, future in batch:
+                conn.execute("SAVEPOINT write")
+                try:
+                    outcomes.append((future, write(conn), None))
+                    conn.execute("RELEASE write")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write")
+                    conn.execute("RELEASE write")
+                    outcomes.append((future, None, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import KMeans
 import numpy as np
@@ -59,3 +59,16 @@ class DifficultyPlanner:
         clusters = self.get_topic_clusters_by_difficulty(topics)
         sequence = clusters["Bronze"] + clusters["Silver"] + clusters["Gold"] + clusters["Platinum"]
         return sequence
+    
+    def get_weak_topics(self, topics: List[Dict], mastery: Dict[str, Tuple[int, int]],
+                        threshold: float = 0.6, min_answered: int = 2) -> List[str]:
+        """
+        Topics answered at least `min_answered` times with accuracy below
+        `threshold`, weakest first. `mastery` maps topic -> (answered, correct).
+        """
+        weak = []
+        for name in (t["main"] for t in topics):
+            answered, correct = mastery.get(name, (0, 0))
+            if answered >= min_answered and correct / answered < threshold:
+                weak.append((correct / answered, name))
+        return [name for _, name in sorted(weak)]
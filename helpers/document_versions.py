@@ -0,0 +1,108 @@
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from helpers.ai_models import get_summary, get_section_summary, clean_summary
+from helpers.db import (
+    save_summary,
+    save_summary_sections,
+    get_summary_sections,
+    get_latest_version,
+    DEFAULT_USER
+)
+from helpers.text_preprocessing import PAGE_BREAK
+
+# Sections are groups of pages cut at content-defined boundaries, so inserting
+# or editing a page only changes the sections around it. A boundary only counts
+# once the section has MIN_SECTION_PAGES and MIN_SECTION_CHARS, so short
+# documents stay a single section (one model call).
+AVG_SECTION_PAGES = 4
+MIN_SECTION_PAGES = 3
+MAX_SECTION_PAGES = 12
+MIN_SECTION_CHARS = 12_000
+MAX_SECTION_CHARS = 80_000
+SECTION_WORKERS = 4
+
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """Split page-separated text into (fingerprint, text) sections."""
+    groups = []
+    current, size = [], 0
+    for page in text.split(PAGE_BREAK):
+        if not page.strip():
+            continue
+        current.append(page)
+        size += len(page)
+        big_enough = len(current) >= MIN_SECTION_PAGES and size >= MIN_SECTION_CHARS
+        at_boundary = big_enough and int(fingerprint(page)[:8], 16) % AVG_SECTION_PAGES == 0
+        too_long = (big_enough and len(current) >= MAX_SECTION_PAGES) or size >= MAX_SECTION_CHARS
+        if at_boundary or too_long:
+            groups.append(current)
+            current, size = [], 0
+    if current:
+        # A short tail joins the previous section rather than becoming its own model call
+        if groups and (len(current) < MIN_SECTION_PAGES or size < MIN_SECTION_CHARS):
+            groups[-1] = groups[-1] + current
+        else:
+            groups.append(current)
+
+    sections = []
+    for pages in groups:
+        section_text = "\n\n".join(pages)
+        sections.append((fingerprint(section_text), section_text))
+    return sections
+
+def summarize_document(name: str, text: str, user_id: str = DEFAULT_USER,
+                       call_limit: Optional[threading.Semaphore] = None) -> Tuple[int, Dict]:
+    """
+    Summarize a document section by section and save it.
+
+    If the user has an earlier version of the same file, sections whose fingerprint
+    is unchanged reuse the stored section summary and only changed sections go
+    to the model. The result is saved as a new version linked to the previous
+    one. Returns (summary_id, stats).
+
+    A document that fits in one section gets the whole-document summary prompt;
+    longer ones use a per-section prompt that leaves out document titles and
+    generic headings, so the joined notes read as one document. Up to
+    SECTION_WORKERS sections are summarized at once; pass a semaphore shared
+    between documents as `call_limit` to cap model calls across all of them.
+    """
+    sections = split_sections(text)
+    previous = get_latest_version(name, user_id)
+    known = dict(get_summary_sections(previous[0], user_id)) if previous else {}
+    call_limit = call_limit or threading.BoundedSemaphore(SECTION_WORKERS)
+
+    summarize = get_summary if len(sections) == 1 else get_section_summary
+
+    def summarize_section(section_text):
+        with call_limit:
+            return clean_summary(summarize(section_text, user_id))
+
+    changed = {fp: section_text for fp, section_text in sections if fp not in known}
+    with ThreadPoolExecutor(max_workers=SECTION_WORKERS) as pool:
+        summaries = pool.map(summarize_section, changed.values())
+        known.update(zip(changed.keys(), summaries))
+
+    section_summaries = [(fp, known[fp]) for fp, _ in sections]
+    content = "\n\n".join(summary for _, summary in section_summaries)
+
+    if previous:
+        parent_id, parent_version = previous
+        version = parent_version + 1
+        title = f"{name} (v{version})"
+    else:
+        parent_id, version, title = None, 1, name
+
+    summary_id = save_summary(title, content, source_name=name, version=version, parent_id=parent_id,
+                              user_id=user_id)
+    save_summary_sections(summary_id, section_summaries)
+    return summary_id, {
+        "version": version,
+        "sections": len(sections),
+        "reused_sections": len(sections) - len(changed),
+    }
@@ -0,0 +1,36 @@
+import json
+import time
+from types import SimpleNamespace
+
+
+class FakeModels:
+    """Stands in for `client.models`, answering from the prompt instead of calling Gemini."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def generate_content(self, model, contents):
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = contents.strip().lower()
+
+        if prompt.startswith("summarize"):
+            words = contents.split("Text to summarize:")[-1].split()[:40]
+            text = "## Summary\n- " + " ".join(words)
+        elif "multiple-choice quiz" in prompt:
+            text = json.dumps([{
+                "question": f"Fake question {i + 1}?",
+                "options": {"A": "First", "B": "Second", "C": "Third", "D": "Fourth"},
+                "correct_option": "A",
+                "answer_explanation": "Generated by the fake model backend."
+            } for i in range(4)])
+        else:
+            text = json.dumps([{"question": f"Fake card {i + 1}", "answer": "Fake answer"} for i in range(3)])
+        return SimpleNamespace(text=text)
+
+
+class FakeClient:
+    """Local model backend with the same surface as genai.Client, for tests and offline runs."""
+
+    def __init__(self, latency=0.0):
+        self.models = FakeModels(latency)
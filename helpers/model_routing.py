@@ -0,0 +1,93 @@
+import json
+import time
+from helpers.db import get_setting, save_model_call
+from helpers.text_preprocessing import estimate_tokens
+
+# Lightest (fastest, cheapest) first. Each model takes inputs up to its
+# max_input_tokens; anything larger goes to the next one in the list.
+DEFAULT_MODELS = [
+    {"model": "gemini-2.5-flash-lite", "max_input_tokens": 8000},
+    {"model": "gemini-2.5-flash", "max_input_tokens": 1000000},
+]
+
+# Latency/cost target per task. The target scales every model's token limit,
+# so "fast" keeps larger inputs on light models and "quality" moves them up sooner.
+DEFAULT_TARGETS = {"summary": "balanced", "quiz": "fast", "flashcards": "fast"}
+TARGET_SCALE = {"fast": 2.0, "balanced": 1.0, "quality": 0.25}
+
+
+def parse_routing(raw):
+    """
+    Parse and check a routing policy:
+    {"models": [{"model": str, "max_input_tokens": int}, ...], "targets": {task: "fast"|"balanced"|"quality"}}
+    Both keys are optional. Raises ValueError describing the first problem found.
+    """
+    policy = json.loads(raw)
+    if not isinstance(policy, dict):
+        raise ValueError("The policy must be a JSON object")
+
+    models = policy.get("models")
+    if models is not None:
+        if not isinstance(models, list) or not models:
+            raise ValueError('"models" must be a non-empty list')
+        for route in models:
+            if not isinstance(route, dict) or not isinstance(route.get("model"), str) or not route["model"]:
+                raise ValueError('Every model needs a "model" name')
+            tokens = route.get("max_input_tokens")
+            if isinstance(tokens, bool) or not isinstance(tokens, int) or tokens <= 0:
+                raise ValueError(f'"max_input_tokens" of {route["model"]} must be a positive integer')
+
+    targets = policy.get("targets", {})
+    if not isinstance(targets, dict):
+        raise ValueError('"targets" must be an object of task: target')
+    for task, target in targets.items():
+        if not isinstance(target, str) or target not in TARGET_SCALE:
+            raise ValueError(f'Target of {task} must be one of: {", ".join(TARGET_SCALE)}')
+    return policy
+
+def get_routing():
+    """Routing policy from the "model_routing" setting merged over the defaults; the defaults if it is malformed."""
+    routing = {"models": DEFAULT_MODELS, "targets": dict(DEFAULT_TARGETS)}
+    raw = get_setting("model_routing")
+    if raw:
+        try:
+            custom = parse_routing(raw)
+        except ValueError:
+            return routing
+        routing["models"] = custom.get("models") or routing["models"]
+        routing["targets"].update(custom.get("targets", {}))
+    return routing
+
+def choose_models(task, input_tokens, routing=None):
+    """Models to try for a request, in order: the routed model, then heavier ones, then lighter ones."""
+    routing = routing or get_routing()
+    models = routing["models"]
+    scale = TARGET_SCALE.get(routing["targets"].get(task, "balanced"), 1.0)
+
+    chosen = len(models) - 1
+    for i, route in enumerate(models):
+        if input_tokens <= route["max_input_tokens"] * scale:
+            chosen = i
+            break
+    order = models[chosen:] + models[:chosen][::-1]
+    return [route["model"] for route in order]
+
+def run_routed(task, contents, call):
+    """
+    Call `call(model)` with the routed model, falling back to the next model
+    when a request fails (overloaded, rate limited, ...). Every attempt's
+    latency is recorded in model_calls. Raises the last error if all fail.
+    """
+    input_tokens = estimate_tokens(contents)
+    last_error = None
+    for model in choose_models(task, input_tokens):
+        started = time.perf_counter()
+        try:
+            result = call(model)
+        except Exception as e:
+            save_model_call(task, model, input_tokens, time.perf_counter() - started, False)
+            last_error = e
+            continue
+        save_model_call(task, model, input_tokens, time.perf_counter() - started, True)
+        return result
+    raise last_error
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+from PyPDF2 import PdfReader
+from helpers.text_preprocessing import preprocess_text, PAGE_BREAK
+
+# Hard cap on extracted characters per document (~100k tokens)
+DEFAULT_MAX_TEXT_CHARS = 400_000
+SPOOL_CHUNK_SIZE = 1 << 20
+
+
+def spool_upload(uploaded_file, suffix=".pdf"):
+    """Copy an uploaded file to a temporary file on disk in chunks and return its path."""
+    uploaded_file.seek(0)
+    with tempfile.NamedTemporaryFile(prefix="upload_", suffix=suffix, delete=False) as tmp:
+        shutil.copyfileobj(uploaded_file, tmp, SPOOL_CHUNK_SIZE)
+    return tmp.name
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _iter_page_text(pdf_reader, start_page=1, end_page=None):
+    total = len(pdf_reader.pages)
+    start = max(1, start_page or 1)
+    end = min(total, end_page or total)
+    for page_number in range(start, end + 1):
+        yield pdf_reader.pages[page_number - 1].extract_text() or ""
+
+def extract_pdf_to_file(pdf_path, start_page=1, end_page=None, max_chars=DEFAULT_MAX_TEXT_CHARS,
+                        preprocess=True):
+    """
+    Extract text from a PDF on disk page by page into a temporary text file.
+
+    Only one page of text is held in memory at a time while extracting, and
+    extraction stops once `max_chars` is reached. With `preprocess`, the capped
+    text is then cleaned in place (see helpers.text_preprocessing). Top-level
+    so it can run in a process pool.
+    """
+    pages_read = 0
+    size = 0
+    truncated = False
+
+    # Given a path, PdfReader loads the whole file into memory; given an open
+    # file it seeks to the objects it needs, so only the pages read are loaded
+    with open(pdf_path, "rb") as pdf_file:
+        pdf_reader = PdfReader(pdf_file)
+        total_pages = len(pdf_reader.pages)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", prefix="extracted_",
+                                         suffix=".txt", delete=False) as out:
+            for page_text in _iter_page_text(pdf_reader, start_page, end_page):
+                if pages_read:
+                    out.write(PAGE_BREAK)
+                pages_read += 1
+                if size + len(page_text) > max_chars:
+                    out.write(page_text[:max_chars - size])
+                    size = max_chars
+                    truncated = True
+                    break
+                out.write(page_text)
+                size += len(page_text)
+
+    token_stats = None
+    if preprocess:
+        with open(out.name, encoding="utf-8") as f:
+            cleaned, token_stats = preprocess_text(f.read())
+        with open(out.name, "w", encoding="utf-8") as f:
+            f.write(cleaned)
+
+    return {
+        "text_path": out.name,
+        "total_pages": total_pages,
+        "pages_read": pages_read,
+        "chars": size,
+        "truncated": truncated,
+        "token_stats": token_stats,
+    }
@@ -0,0 +1,43 @@
+import streamlit as st
+from helpers.db import DEFAULT_USER
+
+SESSION_KEYS = [
+    "selected_summary_title",
+    "selected_summary_id",
+    "generated_quiz_id",
+    "generated_flashcards_id",
+]
+
+
+def auth_enabled():
+    """True when sign-in is configured ([auth] in .streamlit/secrets.toml)."""
+    try:
+        return "auth" in st.secrets
+    except Exception:
+        # No secrets file at all
+        return False
+
+def get_current_user():
+    """
+    The signed-in user (st.login), identified by email. Without [auth]
+    configured the app runs in single-user mode and everyone is DEFAULT_USER.
+    Stops the page with a login button if nobody is signed in.
+    """
+    if not auth_enabled():
+        user_id = DEFAULT_USER
+    elif not st.user.is_logged_in:
+        st.info("Please log in to use the study assistant.")
+        st.button("Log in", on_click=st.login)
+        st.stop()
+    else:
+        user_id = st.user.get("email") or st.user.get("sub")
+
+    if user_id != st.session_state.get("user_id"):
+        # Selections belong to the previous user's data
+        clear_selection()
+        st.session_state["user_id"] = user_id
+    return user_id
+
+def clear_selection():
+    for key in SESSION_KEYS:
+        st.session_state.pop(key, None)
@@ -0,0 +1,124 @@
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+PAGE_BREAK = "\f"
+
+# A line is treated as a running header/footer if it shows up on at least this
+# share of pages (and on at least MIN_REPEAT_PAGES pages)
+REPEAT_PAGE_RATIO = 0.5
+MIN_REPEAT_PAGES = 3
+MAX_HEADER_LINE_LENGTH = 120
+# Running headers/footers are only looked for in this many lines at the top and bottom of a page
+EDGE_LINES = 2
+
+PAGE_NUMBER_RE = re.compile(r'^(page|slide)?\s*\d+\s*((of|/)\s*\d+)?$', re.IGNORECASE)
+BOILERPLATE_RE = re.compile(
+    r'(^(©|\(c\)|copyright)\b)|all rights reserved|^confidential$|^this page (is )?intentionally left blank',
+    re.IGNORECASE
+)
+HYPHEN_BREAK_RE = re.compile(r'(\w)-[ \t]*\n[ \t]*([a-z])')
+INLINE_SPACE_RE = re.compile(r'[ \t ]+')
+BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+def _normalize_line(line: str, mask_digits: bool = False) -> str:
+    line = INLINE_SPACE_RE.sub(' ', line).strip().lower()
+    # Masking digits lets "Lecture 3 - page 12" match across pages
+    return re.sub(r'\d+', '#', line) if mask_digits else line
+
+def _page_lines(page: str) -> List[str]:
+    return [line for line in page.split('\n') if line.strip()]
+
+def _edge_indexes(count: int) -> set:
+    """Positions (among a page's `count` content lines) that can hold a header or footer."""
+    if count <= 1:
+        return set()
+    return set(range(min(EDGE_LINES, count))) | set(range(max(0, count - EDGE_LINES), count))
+
+def find_repeated_lines(pages: List[str]) -> set:
+    """
+    Return normalized lines that repeat across many pages (running headers/footers).
+
+    Only the EDGE_LINES lines at the top and bottom of pages with more than one
+    line are considered, so content that merely recurs mid-page ("Example:",
+    "True", a year) is never counted. The first and last line are also
+    compared with digits masked to catch numbered headers and footers.
+    """
+    if len(pages) < MIN_REPEAT_PAGES:
+        return set()
+
+    counts = Counter()
+    for page in pages:
+        lines = _page_lines(page)
+        edge_lines = [lines[i] for i in sorted(_edge_indexes(len(lines)))
+                      if len(lines[i].strip()) <= MAX_HEADER_LINE_LENGTH]
+        keys = {_normalize_line(line) for line in edge_lines}
+        if len(lines) > 1:
+            keys.add(_normalize_line(lines[0], mask_digits=True))
+            keys.add(_normalize_line(lines[-1], mask_digits=True))
+        counts.update(keys)
+
+    threshold = max(MIN_REPEAT_PAGES, int(len(pages) * REPEAT_PAGE_RATIO))
+    return {line for line, count in counts.items() if count >= threshold}
+
+def _is_noise(line: str, repeated: set, near_edge: bool, at_edge: bool) -> bool:
+    """
+    `near_edge`: among the EDGE_LINES top/bottom lines; `at_edge`: the very first or last line.
+    Mid-page lines are only dropped for boilerplate; bare numbers and repeated
+    lines there are content (a table cell, a year, "Example:").
+    """
+    if BOILERPLATE_RE.search(line):
+        return True
+    if at_edge and PAGE_NUMBER_RE.match(line):
+        return True
+    if near_edge and _normalize_line(line) in repeated:
+        return True
+    return at_edge and _normalize_line(line, mask_digits=True) in repeated
+
+def preprocess_pages(pages: List[str]) -> str:
+    """
+    Clean extracted page texts before they are sent to the model.
+
+    Drops running headers/footers, page numbers and boilerplate lines,
+    rejoins words hyphenated across line breaks and collapses whitespace.
+    Returns the pages joined with form feeds, with empty pages dropped.
+    """
+    repeated = find_repeated_lines(pages)
+
+    cleaned_pages = []
+    for page in pages:
+        page_lines = page.split('\n')
+        content = [i for i, line in enumerate(page_lines) if line.strip()]
+        edges = {content[0], content[-1]} if len(content) > 1 else set()
+        near_edges = {content[i] for i in _edge_indexes(len(content))}
+
+        lines = []
+        for i, line in enumerate(page_lines):
+            line = INLINE_SPACE_RE.sub(' ', line).strip()
+            if line and _is_noise(line, repeated, i in near_edges, i in edges):
+                continue
+            lines.append(line)
+        cleaned_pages.append('\n'.join(lines).strip())
+
+    cleaned_pages = [BLANK_LINES_RE.sub('\n\n', HYPHEN_BREAK_RE.sub(r'\1\2', page)).strip()
+                     for page in cleaned_pages]
+    # Page breaks are kept so later stages can work per page
+    return PAGE_BREAK.join(page for page in cleaned_pages if page)
+
+def preprocess_text(text: str) -> Tuple[str, Dict]:
+    """Preprocess text whose pages are separated by form feeds; return (text, token stats)."""
+    cleaned = preprocess_pages(text.split(PAGE_BREAK))
+    original_tokens = estimate_tokens(text)
+    cleaned_tokens = estimate_tokens(cleaned)
+    saved = original_tokens - cleaned_tokens
+    return cleaned, {
+        "original_tokens": original_tokens,
+        "cleaned_tokens": cleaned_tokens,
+        "saved_tokens": saved,
+        "saved_ratio": saved / original_tokens if original_tokens else 0.0,
+    }
@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from helpers.ai_models import generate_quiz, parse_json_response
+from helpers.concept_extractor import ConceptExtractor
+from helpers.difficulty_planner import DifficultyPlanner
+
+TIERS = ["Bronze", "Silver", "Gold", "Platinum"]
+QUESTIONS_PER_TIER = 3
+
+
+def build_tier_prompts(summary_text: str, clustered_topics: Dict[str, List[str]],
+                       extractor: ConceptExtractor) -> Dict[str, str]:
+    """Slice the summary into the sections that belong to each tier's topics."""
+    sections = extractor.extract_sections(summary_text)
+    tier_texts = {}
+    for tier in TIERS:
+        parts = [sections[topic] for topic in clustered_topics.get(tier, []) if sections.get(topic)]
+        if parts:
+            tier_texts[tier] = "\n\n".join(parts)
+    return tier_texts
+
+def _generate_tier(tier: str, text: str, topics: List[str], num_questions: int, user_id=None) -> List[Dict]:
+    questions = parse_json_response(generate_quiz(text, topics=topics, num_questions=num_questions,
+                                                  user_id=user_id))
+    for question in questions:
+        question["tier"] = tier
+        if question.get("topic") not in topics and len(topics) == 1:
+            question["topic"] = topics[0]
+    return questions
+
+def generate_tiered_quiz(summary_text: str, extractor: ConceptExtractor, planner: DifficultyPlanner,
+                         questions_per_tier: int = QUESTIONS_PER_TIER, max_workers: int = 4,
+                         user_id=None) -> Dict:
+    """
+    Generate one small quiz per difficulty tier, concurrently, and merge them
+    into a single progressive quiz.
+
+    Each tier's request only sees the summary sections of its own topics.
+    Questions are ordered by `get_progressive_quiz_sequence`, falling back to
+    tier order for questions whose topic can't be matched. Returns the merged
+    questions plus per-tier errors; a failed tier does not fail the quiz.
+    """
+    topics = extractor.build_quiz_topics(summary_text)
+    clustered_topics = planner.get_topic_clusters_by_difficulty(topics)
+    sequence = planner.get_progressive_quiz_sequence(topics)
+    tier_texts = build_tier_prompts(summary_text, clustered_topics, extractor)
+
+    results, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            tier: pool.submit(_generate_tier, tier, text, clustered_topics[tier], questions_per_tier, user_id)
+            for tier, text in tier_texts.items()
+        }
+        for tier, future in futures.items():
+            try:
+                results[tier] = future.result()
+            except Exception as e:
+                errors[tier] = str(e)
+
+    position = {topic: idx for idx, topic in enumerate(sequence)}
+
+    def order(question):
+        tier_rank = TIERS.index(question["tier"])
+        return (tier_rank, position.get(question.get("topic"), len(position)))
+
+    questions = sorted((q for tier in TIERS for q in results.get(tier, [])), key=order)
+    return {"questions": questions, "errors": errors}
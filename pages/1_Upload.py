@@ -1,76 +1,84 @@
 import streamlit as st
-import re
-from PyPDF2 import PdfReader
-from weasyprint import HTML
-from helpers.ai_models import get_summary
-from helpers.db import save_summary, init_db, get_all_summaries
+import pandas as pd
+from helpers.batch_upload import process_uploads, get_concurrency_limits, get_max_text_chars
+from helpers.pdf_extraction import spool_upload, remove_file
+from helpers.db import init_db, get_all_summaries
+from helpers.session_user import get_current_user
 
 init_db()
 
-
-def extract_text_from_pdf(file):
-    pdf_reader = PdfReader(file)
-    text = ""
-    for page in pdf_reader.pages:
-        page_text = page.extract_text()
-        if page_text:
-            text += page_text
-    return text
-
 st.set_page_config(page_title="Home - AI Study Assistant", page_icon="🏠")
 
 st.title("🏠 Upload PDF/PPTX")
 st.subheader("Upload your study materials")
 
-uploaded_file = st.file_uploader("Choose a PDF file", type="pdf")
-file_name = uploaded_file.name if uploaded_file else "No file uploaded"
+uploaded_files = st.file_uploader("Choose PDF files", type="pdf", accept_multiple_files=True)
 
-if uploaded_file is None:
-    st.warning("Please upload a PDF file to proceed.")
+if not uploaded_files:
+    st.warning("Please upload one or more PDF files to proceed.")
 else:
-    uploaded_name = getattr(uploaded_file, "name", None)
-    if (
-        "extracted_text" not in st.session_state
-        or st.session_state.get("last_uploaded_name") != uploaded_name
-    ):
-        with st.spinner("Extracting text from PDF..."):
-            st.session_state["extracted_text"] = extract_text_from_pdf(uploaded_file)
-            st.session_state["last_uploaded_name"] = uploaded_name
-        st.success("Text extraction complete!")
+    extract_workers, summary_workers = get_concurrency_limits()
+    max_chars = get_max_text_chars()
+    st.info(
+        f"{len(uploaded_files)} file(s) selected. Click the button below to generate summaries "
+        f"({extract_workers} extraction / {summary_workers} summary workers, change in Settings)."
+    )
 
-    st.markdown("---")
-    st.info("Click the button below to generate a summary.")
+    st.markdown("#### Page Range")
+    col1, col2 = st.columns(2)
+    with col1:
+        start_page = st.number_input("From page:", min_value=1, value=1)
+    with col2:
+        end_page = st.number_input("To page (0 = last page):", min_value=0, value=0)
+    st.caption(f"Text beyond {max_chars:,} characters per document is cut off before summarizing.")
+    preprocess = st.checkbox(
+        "Strip repeated headers/footers, page numbers and extra whitespace before summarizing",
+        value=True
+    )
 
     if st.button("Generate Summary"):
-        text_to_summarize = st.session_state.get("extracted_text", "")
-        if not text_to_summarize:
-            st.warning("No extracted text available to summarize.")
-        else:
-            with st.spinner("Generating summary..."):
-                summary = get_summary(text_to_summarize)
-                if not summary: 
-                    summary = "Summary not available."
-            
-            
-            code_block_match = re.search(
-            r'```(?:markdown|readme)?\s*(.*?)\s*```',
-            summary,
-            re.DOTALL | re.IGNORECASE
-            )
-            if code_block_match:
-                cleaned_summary = code_block_match.group(1).strip()
-            else:
-                cleaned_summary = summary
-                
-            st.session_state["summary"] = cleaned_summary
-            save_summary(file_name, cleaned_summary)
-            
-            # Get the newly saved summary ID
-            all_summaries = get_all_summaries()
-            if all_summaries:
-                latest_id, latest_title = all_summaries[0]  # Most recent summary
-                st.session_state["selected_summary"] = cleaned_summary
-                st.session_state["selected_summary_title"] = latest_title
-                st.session_state["selected_summary_id"] = latest_id
-            
-            st.success("✅ Summary generated and saved! Go to Create Quiz to begin.")
\ No newline at end of file
+        progress_table = st.empty()
+
+        def show_progress(status):
+            df = pd.DataFrame(status, columns=["file", "stage", "note", "error"])
+            df.columns = ["File", "Status", "Extracted", "Error"]
+            progress_table.dataframe(df, width='stretch', hide_index=True)
+
+        # Spool uploads to disk so extraction workers parse from file, not memory
+        files = [(f.name, spool_upload(f)) for f in uploaded_files]
+        try:
+            with st.spinner("Extracting and summarizing..."):
+                results = process_uploads(
+                    files, extract_workers, summary_workers, on_progress=show_progress,
+                    start_page=start_page, end_page=end_page or None, max_chars=max_chars,
+                    preprocess=preprocess, user_id=get_current_user()
+                )
+        finally:
+            for _, path in files:
+                remove_file(path)
+
+        saved = [r for r in results if r["stage"] == "Saved"]
+        failed = [r for r in results if r["stage"] == "Failed"]
+
+        if saved:
+            # Select the last file saved by this batch (not just the user's newest summary,
+            # which may come from another upload running at the same time)
+            latest_id = saved[-1]["summary_id"]
+            titles = dict(get_all_summaries(get_current_user()))
+            st.session_state["selected_summary_title"] = titles.get(latest_id, saved[-1]["file"])
+            st.session_state["selected_summary_id"] = latest_id
+            st.success(f"✅ {len(saved)} summary(ies) generated and saved! Go to Create Quiz to begin.")
+        token_stats = [r["token_stats"] for r in results if r["token_stats"]]
+        if token_stats:
+            original = sum(t["original_tokens"] for t in token_stats)
+            saved_tokens = sum(t["saved_tokens"] for t in token_stats)
+            if original:
+                st.info(f"Preprocessing removed ~{saved_tokens:,} of {original:,} input tokens "
+                        f"({saved_tokens / original:.0%}).")
+
+        truncated = [r for r in results if r["note"] and "truncated" in r["note"]]
+        if truncated:
+            st.warning(f"{len(truncated)} file(s) exceeded the text limit and were summarized only in part. "
+                       "Narrow the page range to cover the rest.")
+        if failed:
+            st.error(f"{len(failed)} file(s) failed. See the table above for details.")
@@ -3,7 +3,10 @@ import streamlit as st
 from helpers.ai_models import generate_quiz
 from helpers.concept_extractor import ConceptExtractor
 from helpers.difficulty_planner import DifficultyPlanner
-from helpers.db import save_quiz_score, init_db
+from helpers.tier_quiz import generate_tiered_quiz
+from helpers.db import save_quiz_score, save_generated_set, get_concept_mastery, init_db
+from helpers.content_cache import get_summary_content, get_concept_tree, get_parsed_set
+from helpers.session_user import get_current_user, clear_selection
 
 st.set_page_config(page_title="Create Quiz - AI Study Assistant", page_icon="📝")
 
@@ -15,14 +18,22 @@ st.markdown("---")
 extractor = ConceptExtractor()
 difficulty_planner = DifficultyPlanner()
 
-if "selected_summary" not in st.session_state:
+summary_id = st.session_state.get("selected_summary_id")
+summary = get_summary_content(summary_id, get_current_user()) if summary_id is not None else None
+if summary is None:
+    # Nothing selected, or the selected summary was deleted (e.g. from another tab)
+    clear_selection()
     st.info("No summary available. Go to Home and select a summary from the list.")
 else:
     st.success(f"📖 Currently viewing: {st.session_state.get('selected_summary_title', 'Summary')}")
     st.markdown("---")
     
-    topics = extractor.build_quiz_topics(st.session_state["selected_summary"])
-    analysis = extractor.analyze_concept_relationships(st.session_state["selected_summary"])
+    concepts = get_concept_tree(summary_id, get_current_user())
+    topics = extractor.topics_from_concepts(concepts)
+    topic_names = [topic["main"] for topic in topics]
+    mastery = get_concept_mastery(summary_id, get_current_user())
+    weak_topics = difficulty_planner.get_weak_topics(topics, mastery)
+    analysis = extractor.analysis_from_concepts(concepts)
     
     st.markdown("### 🧠 Summary Structure Analysis (DFS)")
     
@@ -69,16 +80,43 @@ else:
         else:
             st.info("No topics in this cluster")
     
+    if weak_topics:
+        st.markdown("---")
+        st.markdown("### 🎯 Topics to Review")
+        for topic in weak_topics:
+            answered, correct = mastery[topic]
+            st.write(f"✗ {topic} — {correct}/{answered} correct")
+    
     st.markdown("---")
     st.markdown("### Generate Quiz from Summary")
     
+    quiz_modes = ["Whole summary", "Progressive (by difficulty tier)"]
+    if weak_topics:
+        quiz_modes.append("Weak topics")
+    quiz_mode = st.radio(
+        "Quiz mode:",
+        quiz_modes,
+        horizontal=True
+    )
+    
     if st.button("Create QUIZ", type="primary", width='stretch'):
         with st.spinner("Generating quiz..."):
-            quiz_text = generate_quiz(st.session_state["selected_summary"])
-            st.session_state["generated_quiz"] = quiz_text
+            if quiz_mode == "Whole summary":
+                quiz_text = generate_quiz(summary, topics=topic_names or None, user_id=get_current_user())
+            elif quiz_mode == "Weak topics":
+                sections = extractor.extract_sections(summary)
+                weak_text = "\n\n".join(sections[topic] for topic in weak_topics if sections.get(topic))
+                quiz_text = generate_quiz(weak_text or summary, topics=weak_topics, user_id=get_current_user())
+            else:
+                tiered = generate_tiered_quiz(summary, extractor, difficulty_planner,
+                                              user_id=get_current_user())
+                for tier, error in tiered["errors"].items():
+                    st.warning(f"{tier} questions could not be generated: {error}")
+                quiz_text = json.dumps(tiered["questions"])
+            st.session_state["generated_quiz_id"] = save_generated_set(summary_id, "quiz", quiz_text)
             st.session_state["current_question_index"] = 0
             st.session_state["user_answers"] = {}
-            st.session_state["quiz_performance"] = []
+            st.session_state["question_results"] = {}
             st.session_state["show_results"] = False
             st.session_state["quiz_saved"] = False
         st.success("Quiz generated!")
@@ -89,17 +127,17 @@ else:
         st.session_state.current_question_index = 0
     if "user_answers" not in st.session_state:
         st.session_state.user_answers = {}
-    if "quiz_performance" not in st.session_state:
-        st.session_state.quiz_performance = []
+    if "question_results" not in st.session_state:
+        st.session_state.question_results = {}
     if "show_results" not in st.session_state:
         st.session_state.show_results = False
     if "quiz_saved" not in st.session_state:
         st.session_state.quiz_saved = False
     
     # Display quiz
-    if "generated_quiz" in st.session_state and not st.session_state.show_results:
+    if st.session_state.get("generated_quiz_id") is not None and not st.session_state.show_results:
         try:
-            quiz_data = json.loads(st.session_state["generated_quiz"])
+            quiz_data = get_parsed_set(summary_id, st.session_state["generated_quiz_id"], get_current_user())
             
             if quiz_data and len(quiz_data) > 0:
                 st.markdown("---")
@@ -110,6 +148,8 @@ else:
                 
                 st.progress((current_idx + 1) / len(quiz_data))
                 st.subheader(f"Question {current_idx + 1}/{len(quiz_data)}")
+                if current_question.get("tier"):
+                    st.caption(f"{current_question['tier']} · {current_question.get('topic') or 'General'}")
                 
                 st.write(current_question['question'])
                 
@@ -135,10 +175,19 @@ else:
                         # Check if the selected answer matches the correct option
                         # correct_option is "A", "B", "C", or "D"
                         # options is a dict with keys "A", "B", "C", "D" mapping to answer strings
-                        is_correct = selected_answer == current_question['options']['B']
+                        correct_option = current_question.get('correct_option')
+                        is_correct = selected_answer == current_question['options'].get(correct_option)
                         
-                        # Record performance: 1.0 for correct, 0.0 for incorrect
-                        st.session_state.quiz_performance.append(1.0 if is_correct else 0.0)
+                        # One result per question (a resubmitted answer replaces the earlier one);
+                        # the score and the answer log are both built from these. Only known
+                        # concepts feed mastery.
+                        topic = current_question.get('topic')
+                        st.session_state.question_results[current_idx] = {
+                            "question_index": current_idx,
+                            "topic": topic if topic in topic_names else None,
+                            "tier": current_question.get('tier'),
+                            "correct": is_correct
+                        }
                         
                         # Move to next question or show results if this was the last question
                         # 4 (3)
@@ -160,27 +209,27 @@ else:
             st.error(f"Error: {str(e)}")
     
     # Show results
-    if st.session_state.get("show_results", False) and "generated_quiz" in st.session_state:
-        quiz_data = json.loads(st.session_state["generated_quiz"])
+    if st.session_state.get("show_results", False) and st.session_state.get("generated_quiz_id") is not None:
+        quiz_data = get_parsed_set(summary_id, st.session_state["generated_quiz_id"], get_current_user())
         
         st.markdown("---")
         st.markdown("### 📊 Quiz Results")
 
-        score = sum(st.session_state.quiz_performance) / len(st.session_state.quiz_performance)
+        answers = [st.session_state.question_results[idx] for idx in sorted(st.session_state.question_results)]
+        score = sum(1.0 for answer in answers if answer["correct"]) / len(answers) if answers else 0.0
         st.metric("Score", f"{score * 100:.1f}%")
         
         # Save score to database (only once)
-        summary_id = st.session_state.get("selected_summary_id")
-        if summary_id is not None and not st.session_state.quiz_saved:
-            save_quiz_score(summary_id, score, len(quiz_data))
+        if not st.session_state.quiz_saved:
+            save_quiz_score(summary_id, score, len(quiz_data), user_id=get_current_user(), answers=answers)
             st.session_state.quiz_saved = True
             st.success("✅ Score saved to database!")
         
         if st.button("Take Another Quiz"):
             st.session_state.show_results = False
-            st.session_state.generated_quiz = None
+            st.session_state.generated_quiz_id = None
             st.session_state.quiz_saved = False
             st.session_state.current_question_index = 0
             st.session_state.user_answers = {}
-            st.session_state.quiz_performance = []
+            st.session_state.question_results = {}
             st.rerun()
@@ -1,15 +1,23 @@
-import json
 import streamlit as st
 from helpers.ai_models import generate_flashcards
+from helpers.db import init_db, save_generated_set
+from helpers.content_cache import get_summary_content, get_generated_text, get_parsed_set
+from helpers.session_user import get_current_user, clear_selection
 
 # Configure page
 st.set_page_config(page_title="Flash Cards - AI Study Assistant", page_icon="🃏")
 
+init_db()
+
 st.title("🃏 Flash Cards")
 st.markdown("---")
 st.write("Create and review flash cards for effective memorization.")
 
-if "selected_summary" not in st.session_state:
+summary_id = st.session_state.get("selected_summary_id")
+summary = get_summary_content(summary_id, get_current_user()) if summary_id is not None else None
+if summary is None:
+    # Nothing selected, or the selected summary was deleted (e.g. from another tab)
+    clear_selection()
     st.info("No summary available. Go to Home and select a summary from the list.")
 else:
     st.markdown("---")
@@ -18,9 +26,9 @@ else:
 
     if st.button("Generate Flash Cards", type="primary"):
         with st.spinner("Generating flash cards..."):
-            flashcards_text = generate_flashcards(st.session_state["selected_summary"])
+            flashcards_text = generate_flashcards(summary, user_id=get_current_user())
         # Store the flash cards
-        st.session_state["generated_flashcards"] = flashcards_text
+        st.session_state["generated_flashcards_id"] = save_generated_set(summary_id, "flashcards", flashcards_text)
         st.success("Flash cards generated!")
 
     # Initialize session state for flashcard navigation
@@ -30,9 +38,9 @@ else:
         st.session_state.show_answer = False
 
     # Display generated flash cards
-    if "generated_flashcards" in st.session_state:
+    if st.session_state.get("generated_flashcards_id") is not None:
         try:
-            flashcards_data = json.loads(st.session_state["generated_flashcards"])
+            flashcards_data = get_parsed_set(summary_id, st.session_state["generated_flashcards_id"], get_current_user())
             
             if flashcards_data and len(flashcards_data) > 0:
                 st.markdown("---")
@@ -162,4 +170,4 @@ else:
                 
         except Exception as e:
             st.error("Error parsing flash cards data. Please generate new flash cards.")
-            st.code(st.session_state["generated_flashcards"], language="json")
+            st.code(get_generated_text(summary_id, st.session_state["generated_flashcards_id"], get_current_user()), language="json")
@@ -1,6 +1,11 @@
+import json
 import streamlit as st
-from helpers.db import init_db
-import sqlite3
+import pandas as pd
+from helpers.db import init_db, save_setting, get_setting, get_model_call_stats
+from helpers.batch_upload import get_concurrency_limits, get_max_text_chars
+from helpers.content_cache import DEFAULT_CACHE_MB
+from helpers.model_routing import get_routing, parse_routing
+from helpers.session_user import get_current_user, auth_enabled
 
 st.set_page_config(page_title="Settings", page_icon="⚙️")
 
@@ -9,34 +14,68 @@ st.title("⚙️ Settings")
 # Initialize main database
 init_db()
 
+st.markdown("---")
 
-DB_PATH = "database/summaries.db"
+st.markdown("### 👤 User")
+user_id = get_current_user()
+if auth_enabled():
+    st.write(f"Signed in as **{user_id}**. Summaries, scores and your API key are kept separately per user.")
+    st.button("Log out", on_click=st.logout)
+else:
+    st.caption("Single-user mode. Configure [auth] in .streamlit/secrets.toml to enable sign-in "
+               "and separate data per user.")
 
+st.markdown("---")
 
-def get_api_key():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.execute("SELECT value FROM config WHERE key = 'api_key'")
-    result = cursor.fetchone()
-    conn.close()
-    return result[0] if result else ""
+st.markdown("### 🔑 API Key")
+# The stored key is never sent back to the browser, only whether one is set
+if get_setting("api_key", user_id=user_id):
+    st.success("✅ An API key is set. Enter a new one to replace it.")
+else:
+    st.warning("No API key set yet.")
+api_key = st.text_input("API Key:", type="password", value="")
 
-def save_api_key(key):
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('api_key', ?)", (key,))
-    conn.commit()
-    conn.close()
+if st.button("Save", disabled=not api_key):
+    save_setting("api_key", api_key, user_id=user_id)
+    st.success("✅ API Key saved!")
 
 st.markdown("---")
+st.markdown("### ⚡ Upload Limits")
 
-# Load API key from database
-if 'api_key' not in st.session_state:
-    st.session_state.api_key = get_api_key()
+extract_workers, summary_workers = get_concurrency_limits()
+new_extract_workers = st.number_input("PDF extraction processes:", min_value=1, max_value=32, value=extract_workers)
+new_summary_workers = st.number_input("Concurrent summary requests:", min_value=1, max_value=64, value=summary_workers)
+new_max_chars = st.number_input("Max extracted characters per document:", min_value=1000, step=10000,
+                                value=get_max_text_chars())
+new_cache_mb = st.number_input("Shared content cache (MB):", min_value=1, max_value=4096,
+                               value=int(float(get_setting("content_cache_mb", DEFAULT_CACHE_MB))),
+                               help="Memory for documents shared by all sessions. Applies after a restart.")
 
-st.markdown("### 🔑 API Key")
-# UI
-api_key = st.text_input("API Key:", type="password", value=st.session_state.api_key)
+if st.button("Save Limits"):
+    save_setting("extract_workers", new_extract_workers)
+    save_setting("summary_workers", new_summary_workers)
+    save_setting("max_text_chars", new_max_chars)
+    save_setting("content_cache_mb", new_cache_mb)
+    st.success("✅ Upload limits saved!")
 
-if st.button("Save"):
-    save_api_key(api_key)
-    st.session_state.api_key = api_key
-    st.success("✅ API Key saved!")
+st.markdown("---")
+st.markdown("### 🧭 Model Routing")
+st.write("Models are listed lightest first; each request goes to the first one whose token limit fits "
+         "its input. Targets per task: fast, balanced or quality.")
+
+routing_text = st.text_area("Routing policy (JSON):", value=json.dumps(get_routing(), indent=2), height=250)
+if st.button("Save Routing"):
+    try:
+        parse_routing(routing_text)
+    except ValueError as e:
+        st.error(f"Invalid routing policy: {e}")
+    else:
+        save_setting("model_routing", routing_text)
+        st.success("✅ Routing policy saved!")
+
+stats = get_model_call_stats()
+if stats:
+    stats_df = pd.DataFrame(stats, columns=["Task", "Model", "Calls", "Failures", "Avg s", "Max s", "Avg Tokens"])
+    stats_df[["Avg s", "Max s"]] = stats_df[["Avg s", "Max s"]].round(2)
+    stats_df["Avg Tokens"] = stats_df["Avg Tokens"].round(0)
+    st.dataframe(stats_df, width='stretch', hide_index=True)
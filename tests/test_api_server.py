@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import time
+
+from tornado.testing import AsyncHTTPTestCase, gen_test
+
+import api_server
+from helpers import ai_models, db
+from helpers.fake_model import FakeClient
+
+
+class ApiServerTest(AsyncHTTPTestCase):
+    """Runs the API against a temporary database and the fake model backend."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = os.path.join(self.tmp.name, "test.db")
+        db.init_db()
+        ai_models.set_client_factory(lambda user_id: FakeClient())
+        self.tokens = {user: db.create_api_token(user) for user in ("alice", "bob")}
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        ai_models.set_client_factory(None)
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    def get_app(self):
+        return api_server.make_app(workers=2, job_timeout=10)
+
+    async def request(self, method, path, body=None, user="alice", token=None):
+        token = token or self.tokens[user]
+        response = await self.http_client.fetch(
+            self.get_url(path), method=method, raise_error=False,
+            headers={"Authorization": f"Bearer {token}"}, body=None if body is None else json.dumps(body)
+        )
+        return response.code, json.loads(response.body)
+
+    async def poll(self, job_id, timeout=5):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            code, job = await self.request("GET", f"/api/jobs/{job_id}?wait=1")
+            self.assertEqual(code, 200)
+            if job["status"] in ("done", "failed"):
+                return job
+        self.fail(f"Job {job_id} did not finish")
+
+    @gen_test
+    async def test_quiz_job_submit_poll_done(self):
+        code, job = await self.request("POST", "/api/quizzes", {"text": "Photosynthesis turns light into sugar."})
+        self.assertIn(code, (200, 202))
+        job = await self.poll(job["id"])
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(len(job["result"]), 4)
+        self.assertIn(job["result"][0]["correct_option"], "ABCD")
+
+    @gen_test
+    async def test_summary_is_only_visible_to_its_user(self):
+        code, job = await self.request("POST", "/api/summaries", {"title": "Notes", "text": "Cells divide."})
+        job = await self.poll(job["id"])
+        self.assertEqual(job["status"], "done")
+        summary_id = job["result"]["summary_id"]
+
+        code, _ = await self.request("GET", f"/api/summaries/{summary_id}")
+        self.assertEqual(code, 200)
+        code, _ = await self.request("GET", f"/api/summaries/{summary_id}", user="bob")
+        self.assertEqual(code, 404)
+        code, _ = await self.request("POST", "/api/flashcards", {"summary_id": summary_id}, user="bob")
+        self.assertEqual(code, 404)
+        code, _ = await self.request("GET", f"/api/jobs/{job['id']}", user="bob")
+        self.assertEqual(code, 404)
+        code, _ = await self.request("GET", f"/api/summaries/{10 ** 30}")
+        self.assertEqual(code, 400)
+
+    @gen_test
+    async def test_invalid_numbers_are_rejected(self):
+        code, _ = await self.request("POST", "/api/quizzes", {"text": "x", "num_questions": "many"})
+        self.assertEqual(code, 400)
+        code, _ = await self.request("POST", "/api/quizzes", {"text": "x", "num_questions": 500})
+        self.assertEqual(code, 400)
+        code, _ = await self.request("POST", "/api/quizzes", {"text": "x", "wait": "soon"})
+        self.assertEqual(code, 400)
+
+    @gen_test
+    async def test_requests_need_a_valid_token(self):
+        code, _ = await self.request("GET", "/api/summaries", token="not-a-token")
+        self.assertEqual(code, 401)
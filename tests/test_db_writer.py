@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from helpers.db_writer import DBWriter
+
+
+class DBWriterTest(unittest.TestCase):
+    """Group commit and per-write savepoints of the single database writer."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "test.db")
+        self.writer = DBWriter(self.db_path)
+        self.writer.execute(lambda conn: conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, text TEXT)"))
+
+        # Record every batch the writer thread commits
+        self.batches = []
+        commit_batch = self.writer._commit_batch
+        def recording(conn, batch):
+            self.batches.append(len(batch))
+            commit_batch(conn, batch)
+        self.writer._commit_batch = recording
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def rows(self):
+        with sqlite3.connect(self.db_path) as conn:
+            return [text for text, in conn.execute("SELECT text FROM notes ORDER BY id")]
+
+    def insert(self, text):
+        return lambda conn: conn.execute("INSERT INTO notes (text) VALUES (?)", (text,)).lastrowid
+
+    def block_writer(self):
+        """Occupy the writer thread until the returned event is set, so later writes queue up."""
+        started, release = threading.Event(), threading.Event()
+        def write(conn):
+            started.set()
+            release.wait(5)
+        future = self.writer.submit(write)
+        self.assertTrue(started.wait(5))
+        return future, release
+
+    def test_queued_writes_commit_together(self):
+        blocker, release = self.block_writer()
+        futures = [self.writer.submit(self.insert(f"note {i}")) for i in range(5)]
+        release.set()
+        blocker.result(5)
+        ids = [future.result(5) for future in futures]
+
+        self.assertEqual(self.batches, [1, 5])
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(self.rows(), [f"note {i}" for i in range(5)])
+
+    def test_failing_write_is_rolled_back_alone(self):
+        def half_done(conn):
+            conn.execute("INSERT INTO notes (text) VALUES ('partial')")
+            raise ValueError("bad write")
+
+        blocker, release = self.block_writer()
+        before = self.writer.submit(self.insert("before"))
+        failing = self.writer.submit(half_done)
+        after = self.writer.submit(self.insert("after"))
+        release.set()
+        blocker.result(5)
+
+        with self.assertRaises(ValueError):
+            failing.result(5)
+        self.assertIsNotNone(before.result(5))
+        self.assertIsNotNone(after.result(5))
+        self.assertEqual(self.batches, [1, 3])
+        self.assertEqual(self.rows(), ["before", "after"])
+
+    def test_batches_are_capped(self):
+        self.writer.max_batch = 2
+        blocker, release = self.block_writer()
+        futures = [self.writer.submit(self.insert(f"note {i}")) for i in range(5)]
+        release.set()
+        for future in [blocker] + futures:
+            future.result(5)
+        self.assertEqual(self.batches, [1, 2, 2, 1])
+        self.assertEqual(len(self.rows()), 5)
@@ -0,0 +1,116 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from helpers import ai_models, db
+from helpers.ai_models import _single_flight
+from helpers.fake_model import FakeClient
+
+
+class SingleFlightTest(unittest.TestCase):
+    """Coalescing of identical model requests, driven by hand-controlled leaders."""
+
+    def setUp(self):
+        self.pool = ThreadPoolExecutor(max_workers=4)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.pool.shutdown()
+
+    def start_leader(self, key, fn, wait=5):
+        future = self.pool.submit(_single_flight, key, fn, wait)
+        deadline = time.monotonic() + 5
+        while key not in ai_models._inflight:
+            self.assertLess(time.monotonic(), deadline, "Leader never started")
+            time.sleep(0.01)
+        return future
+
+    def blocked(self, result=None, error=None):
+        def fn():
+            self.release.wait(5)
+            if error is not None:
+                raise error
+            return result
+        return fn
+
+    def test_waiters_share_the_result(self):
+        calls = []
+        leader = self.start_leader("same", self.blocked(result="summary"))
+        follower = self.pool.submit(_single_flight, "same", lambda: calls.append(1), 5)
+        time.sleep(0.1)
+        self.release.set()
+        self.assertEqual(leader.result(5), "summary")
+        self.assertEqual(follower.result(5), "summary")
+        self.assertEqual(calls, [])
+        self.assertNotIn("same", ai_models._inflight)
+
+    def test_waiters_share_the_error(self):
+        error = RuntimeError("quota exceeded")
+        leader = self.start_leader("failing", self.blocked(error=error))
+        follower = self.pool.submit(_single_flight, "failing", lambda: "not called", 5)
+        time.sleep(0.1)
+        self.release.set()
+        for future in (leader, follower):
+            with self.assertRaises(RuntimeError) as raised:
+                future.result(5)
+            self.assertIs(raised.exception, error)
+        self.assertNotIn("failing", ai_models._inflight)
+
+    def test_waiter_times_out(self):
+        leader = self.start_leader("slow", self.blocked(result="late"), wait=5)
+        with self.assertRaises(TimeoutError):
+            _single_flight("slow", lambda: "not called", 0.1)
+        self.release.set()
+        self.assertEqual(leader.result(5), "late")
+
+    def test_stale_leader_is_taken_over(self):
+        stuck = self.start_leader("stuck", self.blocked(result="stale"))
+        time.sleep(0.2)
+        # Older than the caller's wait: the caller runs its own request
+        self.assertEqual(_single_flight("stuck", lambda: "fresh", 0.1), "fresh")
+        self.release.set()
+        self.assertEqual(stuck.result(5), "stale")
+        self.assertNotIn("stuck", ai_models._inflight)
+
+
+class GenerateCoalescingTest(unittest.TestCase):
+    """Identical prompts sent at once reach the (fake) model backend once."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = os.path.join(self.tmp.name, "test.db")
+        db.init_db()
+        self.clients = []
+        ai_models.set_client_factory(self.make_client)
+
+    def tearDown(self):
+        # Model calls are logged in the background; let them land before the database goes
+        db.get_writer().execute(lambda conn: None)
+        ai_models.set_client_factory(None)
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    def make_client(self, user_id):
+        client = FakeClient(latency=0.3)
+        self.clients.append(client)
+        calls = []
+        generate = client.models.generate_content
+        client.models.generate_content = lambda **kwargs: calls.append(1) or generate(**kwargs)
+        client.calls = calls
+        return client
+
+    def test_identical_prompts_share_one_call(self):
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            summaries = list(pool.map(lambda _: ai_models.get_summary("Cells divide by mitosis."), range(3)))
+        self.assertEqual(len(set(summaries)), 1)
+        self.assertEqual(sum(len(client.calls) for client in self.clients), 1)
+
+    def test_different_prompts_are_not_shared(self):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            list(pool.map(ai_models.get_summary, ["Cells divide.", "Plants grow."]))
+        self.assertEqual(sum(len(client.calls) for client in self.clients), 2)